@@ -1,11 +1,20 @@
+import time
+
+_process_start = time.perf_counter()
+
 import discord
 from discord.ext import commands
 import os
 from dotenv import load_dotenv
 from utils.database import init_database, can_earn_daily_message_reward, process_daily_message_reward
+from utils.startup_timer import StartupTimer
+from utils.command_sync import sync_if_changed
+from utils.event_trace import EventTraceRecorder
+from utils.asset_cache import AssetCache
+from utils.activity import ActivityHistogram
+from utils.http import HTTPClients
 
-# Load environment variables
-load_dotenv()
+TARGET_EMOJIS = {"6️⃣", "7️⃣"}
 
 # Bot setup
 intents = discord.Intents.default()
@@ -13,115 +22,175 @@ intents.message_content = True
 intents.members = True
 intents.guilds = True
 
+# Cogs are loaded in this order. Their heavy third-party dependencies (openai, spotipy, PIL,
+# httpx, apscheduler, pytz) are imported lazily, so loading them here stays cheap.
+COGS = [
+    'cogs.coins',
+    'cogs.shooting_star',
+    'cogs.photos',
+    'cogs.llm',
+    'cogs.custom_role',
+    'cogs.sotd',
+    'cogs.snap',
+    'cogs.birthday',
+]
+
 class NotObjectBot(commands.Bot):
     def __init__(self):
         super().__init__(command_prefix='!', intents=intents)
+        self.startup = StartupTimer(_process_start)
+        self.startup.record('imports', time.perf_counter() - _process_start)
+        self._setup_finished_at = None
+        # Opt-in anonymized event trace for realistic benchmarks (set EVENT_TRACE_DIR to enable)
+        self.event_trace = EventTraceRecorder.from_env()
+        # Static images are uploaded once and reused by URL (see utils/asset_cache.py)
+        self.assets = AssetCache(self)
+        # Per-channel, per-hour message activity used to schedule shooting stars when people are around
+        self.message_activity = ActivityHistogram()
+        # Pooled HTTP clients for outbound calls, created in setup_hook (see utils/http.py)
+        self.http_clients = None
 
     async def setup_hook(self):
         """Called when the bot is starting up"""
+        self.http_clients = HTTPClients()
+        
         # Load cogs
-        await self.load_extension('cogs.coins')
-        await self.load_extension('cogs.shooting_star')
-        await self.load_extension('cogs.photos')
-        await self.load_extension('cogs.llm')
-        await self.load_extension('cogs.custom_role')
-        await self.load_extension('cogs.sotd')
-        await self.load_extension('cogs.snap')
-        await self.load_extension('cogs.birthday')
+        with self.startup.phase('cog load (all)'):
+            for extension in COGS:
+                with self.startup.phase(f'  {extension}'):
+                    await self.load_extension(extension)
         
-        # Sync commands
-        # await self.tree.sync()
+        # Sync commands, only for scopes whose command fingerprint changed since the last sync
+        with self.startup.phase('command sync'):
+            await sync_if_changed(self.tree, force=os.getenv('COMMAND_SYNC_FORCE', '').lower() in ('1', 'true', 'yes'))
+
+        self._setup_finished_at = time.perf_counter()
 
     async def on_ready(self):
         print(f'{self.user} has connected to Discord!')
+        if not self.startup.reported and self._setup_finished_at is not None:
+            self.startup.record('connect to first READY', time.perf_counter() - self._setup_finished_at)
+            self.startup.report()
         init_database()
         
-        # Start the shooting star task
+        # Start the shooting star scheduler (safe to call again on reconnect)
         shooting_star_cog = self.get_cog('ShootingStarCog')
         if shooting_star_cog:
-            shooting_star_cog.shooting_star_task.start()
-
-bot = NotObjectBot()
-
-@bot.event
-async def on_message(message):
-    # Ignore bot messages
-    if message.author.bot:
-        await bot.process_commands(message)
-        return
-
-    # Check if this is the user's first message of the day (UTC) for coin reward
-    user_id = message.author.id
-    username = message.author.display_name
-    
-    if can_earn_daily_message_reward(user_id):
-        # Check for Twitch subscriber multipliers
-        multiplier = 1.0
+            shooting_star_cog.start_scheduler()
         
-        # Server owner always gets 1x multiplier
-        owner_user_id = os.getenv('OWNER_USER_ID')
-        if owner_user_id and str(user_id) == str(owner_user_id):
+        # Index photos added since the last run and watch for new ones
+        photos_cog = self.get_cog('PhotosCog')
+        if photos_cog:
+            photos_cog.start_ingest()
+
+    async def close(self):
+        """Close HTTP clients, save activity counts and flush the event trace before shutting down"""
+        await super().close()
+        if self.http_clients:
+            await self.http_clients.close()
+        try:
+            self.message_activity.flush()
+        except Exception as e:
+            print(f"Error saving channel activity: {e}")
+        if self.event_trace:
+            self.event_trace.close()
+            self.event_trace = None
+
+    async def on_message(self, message):
+        # Ignore bot messages
+        if message.author.bot:
+            await self.process_commands(message)
+            return
+
+        self.message_activity.record(message.channel.id)
+
+        if self.event_trace:
+            shooting_star_cog = self.get_cog('ShootingStarCog')
+            star_match = shooting_star_cog.is_star_word(message.channel.id, message.content) if shooting_star_cog else False
+            self.event_trace.record('message', message.author.id, message.channel.id, content=message.content, star_match=star_match)
+
+        # Check if this is the user's first message of the day (UTC) for coin reward
+        user_id = message.author.id
+        username = message.author.display_name
+
+        if can_earn_daily_message_reward(user_id):
+            # Check for Twitch subscriber multipliers
             multiplier = 1.0
-        else:
-            # Check for Twitch subscriber roles
-            member = message.guild.get_member(user_id)
-            if member:
-                twitch_tier_1_role_id = os.getenv('TWITCH_TIER_1_ROLE_ID')
-                twitch_tier_2_role_id = os.getenv('TWITCH_TIER_2_ROLE_ID')
-                twitch_tier_3_role_id = os.getenv('TWITCH_TIER_3_ROLE_ID')
-
-                roles = member.roles
-                tier_1_role = discord.utils.get(message.guild.roles, id=int(twitch_tier_1_role_id)) if twitch_tier_1_role_id else None
-                tier_2_role = discord.utils.get(message.guild.roles, id=int(twitch_tier_2_role_id)) if twitch_tier_2_role_id else None
-                tier_3_role = discord.utils.get(message.guild.roles, id=int(twitch_tier_3_role_id)) if twitch_tier_3_role_id else None
-                
-                if tier_3_role and tier_3_role in roles:
-                    multiplier = 2.0
-                elif tier_2_role and tier_2_role in roles:
-                    multiplier = 1.4
-                elif tier_1_role and tier_1_role in roles:
-                    multiplier = 1.2
-        
-        # Calculate coin amount with multiplier
-        base_coins = 200
-        total_coins = int(base_coins * multiplier)
-        
-        # Award coins for first message of the day with multiplier
-        process_daily_message_reward(user_id, username, total_coins)
-    
-    # Process commands
-    await bot.process_commands(message)
 
-@bot.event
-async def on_voice_state_update(member, before, after):
-    if not before.channel and after.channel:
-        username = member.display_name
+            # Server owner always gets 1x multiplier
+            owner_user_id = os.getenv('OWNER_USER_ID')
+            if owner_user_id and str(user_id) == str(owner_user_id):
+                multiplier = 1.0
+            else:
+                # Check for Twitch subscriber roles
+                member = message.guild.get_member(user_id)
+                if member:
+                    twitch_tier_1_role_id = os.getenv('TWITCH_TIER_1_ROLE_ID')
+                    twitch_tier_2_role_id = os.getenv('TWITCH_TIER_2_ROLE_ID')
+                    twitch_tier_3_role_id = os.getenv('TWITCH_TIER_3_ROLE_ID')
 
-        vc_role_id = os.getenv('VC_ROLE_ID')
-        if vc_role_id:
-            await bot.get_channel(after.channel.id).send(f"<@&{vc_role_id}> {username} has joined {after.channel.name}!", delete_after=300)
+                    roles = member.roles
+                    tier_1_role = discord.utils.get(message.guild.roles, id=int(twitch_tier_1_role_id)) if twitch_tier_1_role_id else None
+                    tier_2_role = discord.utils.get(message.guild.roles, id=int(twitch_tier_2_role_id)) if twitch_tier_2_role_id else None
+                    tier_3_role = discord.utils.get(message.guild.roles, id=int(twitch_tier_3_role_id)) if twitch_tier_3_role_id else None
 
-TARGET_EMOJIS = {"6️⃣", "7️⃣"}
+                    if tier_3_role and tier_3_role in roles:
+                        multiplier = 2.0
+                    elif tier_2_role and tier_2_role in roles:
+                        multiplier = 1.4
+                    elif tier_1_role and tier_1_role in roles:
+                        multiplier = 1.2
+
+            # Calculate coin amount with multiplier
+            base_coins = 200
+            total_coins = int(base_coins * multiplier)
+
+            # Award coins for first message of the day with multiplier
+            process_daily_message_reward(user_id, username, total_coins)
+
+        # Process commands
+        await self.process_commands(message)
+
+    async def on_interaction(self, interaction):
+        if self.event_trace and interaction.type == discord.InteractionType.application_command:
+            command_name = interaction.command.qualified_name if interaction.command else (interaction.data or {}).get('name')
+            self.event_trace.record('command', interaction.user.id, interaction.channel_id, name=command_name)
+
+    async def on_voice_state_update(self, member, before, after):
+        if self.event_trace:
+            self.event_trace.record('voice', member.id, after.channel.id if after.channel else None)
+
+        if not before.channel and after.channel:
+            username = member.display_name
+
+            vc_role_id = os.getenv('VC_ROLE_ID')
+            if vc_role_id:
+                await self.get_channel(after.channel.id).send(f"<@&{vc_role_id}> {username} has joined {after.channel.name}!", delete_after=300)
+
+    # 6 7 is not allowed
+    async def on_reaction_add(self, reaction, user):
+        if user.bot:
+            return
 
-# 6 7 is not allowed
-@bot.event
-async def on_reaction_add(reaction, user):
-    if user.bot:
-        return
+        if self.event_trace:
+            self.event_trace.record('reaction', user.id, reaction.message.channel.id)
 
-    message = await reaction.message.channel.fetch_message(reaction.message.id)
+        message = await reaction.message.channel.fetch_message(reaction.message.id)
 
-    # get all emoji reactions on the message
-    present = {str(r.emoji) for r in message.reactions}
+        # get all emoji reactions on the message
+        present = {str(r.emoji) for r in message.reactions}
 
-    # check if both 6 and 7 are present
-    if TARGET_EMOJIS.issubset(present):
-        for emoji in TARGET_EMOJIS:
-            await message.clear_reaction(emoji)
+        # check if both 6 and 7 are present
+        if TARGET_EMOJIS.issubset(present):
+            for emoji in TARGET_EMOJIS:
+                await message.clear_reaction(emoji)
 
-        print(f"6 7 reactions by {user.name} removed.")
+            print(f"6 7 reactions by {user.name} removed.")
 
 
-# Run the bot
+# Run the bot. The bot is only built here: photo ingest starts worker processes with spawn, which
+# re-import this module, and they shouldn't each construct a bot (and open the event trace)
 if __name__ == "__main__":
+    load_dotenv()
+    bot = NotObjectBot()
     bot.run(os.getenv('DISCORD_TOKEN'))
@@ -3,9 +3,7 @@ from discord.ext import commands
 from discord import app_commands
 import os
 from datetime import datetime, timezone
-import pytz
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
+from utils.lazy_import import lazy_import
 from utils.database import (
     set_user_birthday,
     get_user_birthday,
@@ -15,6 +13,10 @@ from utils.database import (
     get_unique_timezones
 )
 
+pytz = lazy_import('pytz')
+apscheduler_asyncio = lazy_import('apscheduler.schedulers.asyncio')
+apscheduler_cron = lazy_import('apscheduler.triggers.cron')
+
 
 async def month_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
     """Autocomplete for month selection - shows list of all months"""
@@ -102,7 +104,7 @@ class BirthdayCog(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
-        self.scheduler = AsyncIOScheduler()
+        self.scheduler = None  # Created in on_ready so loading the cog doesn't import apscheduler
         self.birthday_channel_id = int(os.getenv('BIRTHDAY_CHANNEL_ID')) if os.getenv('BIRTHDAY_CHANNEL_ID') else None
         self.sent_birthdays_today = {}  # Track which user IDs we've sent birthday messages to (key: timezone, value: set of user_ids)
         self.scheduled_timezones = set()  # Track which timezones have scheduled jobs
@@ -110,6 +112,8 @@ class BirthdayCog(commands.Cog):
     @commands.Cog.listener()
     async def on_ready(self):
         """Start the scheduler when the cog is ready"""
+        if self.scheduler is None:
+            self.scheduler = apscheduler_asyncio.AsyncIOScheduler()
         if not self.scheduler.running:
             self.scheduler.start()
             # Schedule jobs for all existing timezones
@@ -135,7 +139,7 @@ class BirthdayCog(commands.Cog):
             job_id = f'birthday_check_{tz_name}'
             self.scheduler.add_job(
                 self.check_birthdays_for_timezone,
-                trigger=CronTrigger(hour=0, minute=0, timezone=tz),
+                trigger=apscheduler_cron.CronTrigger(hour=0, minute=0, timezone=tz),
                 id=job_id,
                 replace_existing=True,
                 args=[tz_name]
@@ -469,7 +473,7 @@ class BirthdayCog(commands.Cog):
 
     def cog_unload(self):
         """Clean up when cog is unloaded"""
-        if self.scheduler.running:
+        if self.scheduler and self.scheduler.running:
             self.scheduler.shutdown()
 
 
@@ -1,154 +1,381 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
+import asyncio
+import multiprocessing
 import os
-import random
 import shutil
-from PIL import Image
-from PIL.ExifTags import TAGS, GPSTAGS
-from geopy.geocoders import Nominatim
-from utils.database import get_user_coins, spend_coins, refund_coins
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.database import (
+    get_user_coins,
+    spend_coins,
+    refund_coins,
+    get_indexed_photos,
+    save_photos,
+    get_unresolved_photo_locations,
+    set_photo_location,
+    delete_photos,
+    claim_random_photo,
+    get_photos_without_derivative,
+    set_photo_derivatives,
+    get_photo_hashes,
+    set_photo_hashes,
+    enqueue_ready_photos
+)
+from utils.photo_metadata import is_image_file, extract_metadata, derivative_name, make_derivative, resolve_location
+from utils.geocode_cache import GeocodeCache
+from utils.photo_catalog import PhotoCatalog
+from utils.photo_dedup import compute_dhash, to_signed, to_unsigned, HammingIndex
 
 
 class PhotosCog(commands.Cog):
     """Cog for handling photo-related commands"""
     
+    # How many newly indexed photos to write per transaction
+    INGEST_BATCH_SIZE = 100
+    # Wait this long after the last new file before ingesting, so bulk copies are handled in one go
+    WATCH_DEBOUNCE_SECONDS = 2
+    
     def __init__(self, bot):
         self.bot = bot
         self.photos_dir = "photos"
         self.revealed_dir = os.path.join(self.photos_dir, "revealed")
+        # Resized, EXIF-stripped copies that /photo sends instead of the originals
+        self.derivatives_dir = os.path.join(self.photos_dir, "derivatives")
+        self.derivative_max_dimension = int(os.getenv('PHOTO_MAX_DIMENSION', '2048'))
+        self.derivative_quality = int(os.getenv('PHOTO_JPEG_QUALITY', '85'))
+        self.derivative_workers = int(os.getenv('PHOTO_WORKERS', '0')) or None  # None = one per CPU
+        # Photos whose perceptual hashes differ by at most this many bits count as the same photo (0 = exact only)
+        self.duplicate_distance = int(os.getenv('PHOTO_DUPLICATE_DISTANCE', '6'))
+        self.ingest_task = None
+        self.ingest_requested = False
+        # File names on disk, so reconcile can tell when the directories changed
+        self.catalog = PhotoCatalog(self.photos_dir, self.revealed_dir)
+        # Files that failed to index, with their modification time, so they're only retried once they change
+        self.failed_files = {}
+        self.observer = None
+        self.reconcile_task = None
+        self.debounce_handle = None
+        # Photos from the same place share one reverse geocoding lookup
+        self.geocode_cache = GeocodeCache(resolver=self.resolve_location)
 
-    def get_photo_counts(self):
-        """Get counts of total photos and revealed photos"""
-        try:
-            # Get all image files from main photos directory (unrevealed)
-            unrevealed_files = [f for f in os.listdir(self.photos_dir) 
-                              if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp'))]
-            
-            # Get all image files from revealed directory
-            revealed_files = [f for f in os.listdir(self.revealed_dir) 
-                             if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp'))]
-            
-            # Total photos = unrevealed + revealed
-            total_photos = len(unrevealed_files) + len(revealed_files)
-            revealed_photos = len(revealed_files)
-            
-            return total_photos, revealed_photos
-        except Exception as e:
-            print(f"Error getting photo counts: {e}")
-            return 0, 0
+    def resolve_location(self, lat, lon):
+        """Reverse geocode coordinates, using the bot's pooled Nominatim client when there's no offline dataset"""
+        return resolve_location(lat, lon, self.bot.http_clients.get_sync('nominatim'))
+
+    def start_ingest(self):
+        """Index new photos now and whenever files are added (safe to call again on reconnect)"""
+        self.request_ingest()
+        self.start_watcher()
+        if self.reconcile_task is None or self.reconcile_task.done():
+            self.reconcile_task = asyncio.create_task(self.run_reconcile())
+
+    def request_ingest(self):
+        """Run an ingest, or another one right after the current one if it's already running"""
+        self.ingest_requested = True
+        if self.ingest_task is None or self.ingest_task.done():
+            self.ingest_task = asyncio.create_task(self.run_ingest())
 
-    def get_exif_data(self, image_path):
-        """Extract EXIF data from an image"""
+    async def run_ingest(self):
+        """Run ingests in a worker thread until no more are requested"""
+        while self.ingest_requested:
+            self.ingest_requested = False
+            await asyncio.to_thread(self.ingest_photos)
+
+    def start_watcher(self):
+        """Watch photos/ for new files with watchdog if it's installed, otherwise rely on reconcile"""
+        if self.observer is not None:
+            return
         try:
-            image = Image.open(image_path)
-            exif_data = image._getexif()
-            
-            if exif_data is not None:
-                exif = {}
-                for tag_id, value in exif_data.items():
-                    tag = TAGS.get(tag_id, tag_id)
-                    exif[tag] = value
-                return exif
-        except Exception as e:
-            print(f"Error reading EXIF data: {e}")
-        return {}
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            print("watchdog not installed, checking for new photos periodically instead")
+            return
 
-    def get_gps_data(self, exif_data):
-        """Extract GPS data from EXIF"""
-        if 'GPSInfo' not in exif_data:
-            return None
-        
-        gps_info = exif_data['GPSInfo']
-        gps_data = {}
-        
-        for key, value in gps_info.items():
-            tag = GPSTAGS.get(key, key)
-            gps_data[tag] = value
-        
-        return gps_data
+        loop = asyncio.get_running_loop()
+        cog = self
+
+        class NewPhotoHandler(FileSystemEventHandler):
+            def on_created(self, event):
+                self.check(event.src_path)
+
+            def on_moved(self, event):
+                self.check(event.dest_path)
+
+            def on_modified(self, event):
+                # A file still being copied in keeps pushing the ingest back until it's complete
+                self.check(event.src_path)
+
+            def check(self, path):
+                # Only new images directly in photos/; our own moves to revealed/ are already known
+                if os.path.dirname(os.path.abspath(path)) == os.path.abspath(cog.photos_dir) and is_image_file(path):
+                    loop.call_soon_threadsafe(cog.on_new_photo)
+
+        self.observer = Observer()
+        self.observer.schedule(NewPhotoHandler(), self.photos_dir, recursive=False)
+        self.observer.daemon = True
+        self.observer.start()
+        print(f"Watching {self.photos_dir} for new photos")
+
+    def on_new_photo(self):
+        """Ingest once files stop arriving"""
+        if self.debounce_handle:
+            self.debounce_handle.cancel()
+        self.debounce_handle = asyncio.get_running_loop().call_later(self.WATCH_DEBOUNCE_SECONDS, self.request_ingest)
+
+    async def run_reconcile(self):
+        """Periodically rescan the directories to catch anything the watcher missed (or everything, without one)"""
+        default_interval = 600 if self.observer else 60
+        interval = int(os.getenv('PHOTO_RECONCILE_SECONDS', str(default_interval)))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                needs_ingest = await asyncio.to_thread(self.needs_ingest)
+            except Exception as e:
+                print(f"Error checking photo directories: {e}")
+                continue
+            if needs_ingest:
+                self.request_ingest()
 
-    def convert_to_degrees(self, value):
-        """Convert GPS coordinates to degrees"""
-        d, m, s = value
-        return d + (m / 60.0) + (s / 3600.0)
+    def needs_ingest(self):
+        """Check whether the directories changed, or hold files that still aren't indexed (e.g. ones that
+        failed to index because they were caught mid-copy). Runs in a worker thread"""
+        on_disk, changed = self.catalog.reconcile()
+        if changed:
+            return True
+        indexed = get_indexed_photos()
+        return any(filename not in indexed and not self.failed_unchanged(filename, revealed)
+                   for filename, revealed in on_disk.items())
 
-    def get_location_from_gps(self, gps_data):
-        """Get city and country from GPS coordinates using reverse geocoding"""
-        if not gps_data:
-            return None, None
+    def photo_path(self, filename, revealed):
+        """Get the path of a photo in the unrevealed or revealed directory"""
+        return os.path.join(self.revealed_dir if revealed else self.photos_dir, filename)
+
+    def failed_unchanged(self, filename, revealed):
+        """Check whether a file already failed to index and hasn't changed since"""
+        failed_mtime = self.failed_files.get(filename)
+        if failed_mtime is None:
+            return False
+        try:
+            return os.stat(self.photo_path(filename, revealed)).st_mtime_ns == failed_mtime
+        except OSError:
+            return False
+
+    def ingest_photos(self):
+        """Add photos that aren't indexed yet to the photos table and resolve their locations.
         
+        Parsing and geocoding happen here, once per photo, so /photo never has to open an image.
+        Runs in a worker thread.
+        """
         try:
-            lat = self.convert_to_degrees(gps_data['GPSLatitude'])
-            lon = self.convert_to_degrees(gps_data['GPSLongitude'])
+            indexed = get_indexed_photos()
+            on_disk, _ = self.catalog.reconcile()
             
-            if gps_data['GPSLatitudeRef'] == 'S':
-                lat = -lat
-            if gps_data['GPSLongitudeRef'] == 'W':
-                lon = -lon
+            # Forget photos that were removed from disk
+            missing = [filename for filename in indexed if filename not in on_disk]
+            if missing:
+                delete_photos(missing)
+                for filename in missing:
+                    derivative_path = os.path.join(self.derivatives_dir, derivative_name(filename))
+                    if os.path.exists(derivative_path):
+                        os.remove(derivative_path)
             
-            # Use Nominatim for reverse geocoding
-            geolocator = Nominatim(user_agent="not-object-bot")
-            location = geolocator.reverse(f"{lat}, {lon}", exactly_one=True)
+            # Forget failures for files that are gone
+            for filename in [filename for filename in self.failed_files if filename not in on_disk]:
+                del self.failed_files[filename]
             
-            if location:
-                address = location.raw.get('address', {})
-                city = address.get('city') or address.get('town') or address.get('village') or address.get('hamlet')
-                country = address.get('country')
+            batch = []
+            added = 0
+            for filename, revealed in on_disk.items():
+                if filename in indexed or self.failed_unchanged(filename, revealed):
+                    continue
                 
-                if city and country:
-                    return city, country
-                elif country:
-                    return f"{lat:.4f}°N" if lat >= 0 else f"{abs(lat):.4f}°S", country
-                else:
-                    return f"{lat:.4f}°N" if lat >= 0 else f"{abs(lat):.4f}°S", f"{lon:.4f}°E" if lon >= 0 else f"{abs(lon):.4f}°W"
-            else:
-                # Fallback to coordinates if geocoding fails
-                return f"{lat:.4f}°N" if lat >= 0 else f"{abs(lat):.4f}°S", f"{lon:.4f}°E" if lon >= 0 else f"{abs(lon):.4f}°W"
+                path = self.photo_path(filename, revealed)
+                try:
+                    metadata = extract_metadata(path)
+                except Exception as e:
+                    print(f"Error indexing photo {filename}: {e}")
+                    try:
+                        self.failed_files[filename] = os.stat(path).st_mtime_ns
+                    except OSError:
+                        pass
+                    continue
+                self.failed_files.pop(filename, None)
                 
-        except Exception as e:
-            print(f"Error processing GPS data: {e}")
-            return None, None
-
-    def get_random_photo_info(self):
-        """Get a random photo from the photos directory with location info and move it to revealed"""
-        try:
-            # Get all image files from photos directory
-            image_files = [f for f in os.listdir(self.photos_dir) 
-                          if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp'))]
-            
-            if not image_files:
-                return None, "You have seen all the photos. Stay tuned for more!"
+                batch.append({
+                    'filename': filename,
+                    **metadata,
+                    'city': None,
+                    'country': None,
+                    # Photos without GPS have nothing to resolve
+                    'location_resolved': 0 if metadata['latitude'] is not None else 1,
+                    'revealed': int(revealed),
+                    'content_hash': None
+                })
+                if len(batch) >= self.INGEST_BATCH_SIZE:
+                    save_photos(batch)
+                    added += len(batch)
+                    batch = []
+            if batch:
+                save_photos(batch)
+                added += len(batch)
             
-            # Select a random photo
-            random_photo = random.choice(image_files)
-            photo_path = os.path.join(self.photos_dir, random_photo)
+            # Spawn rather than fork, since the bot process has other threads running.
+            # Workers only start once there's something to hash or convert.
+            with ProcessPoolExecutor(max_workers=self.derivative_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                duplicates = self.find_duplicates(pool, rebuild=added > 0 or bool(missing))
+                derivatives = self.generate_derivatives(pool)
             
-            # Extract EXIF data before moving the file
-            exif_data = self.get_exif_data(photo_path)
-            gps_data = self.get_gps_data(exif_data)
+            # New photos only become claimable by /photo now, so a duplicate can't be revealed before it's flagged.
+            # Photos that couldn't be hashed stay out and are retried next time
+            queued = enqueue_ready_photos()
             
-            # Get location information
-            city, country = self.get_location_from_gps(gps_data)
+            # Resolve locations separately so a slow geocoder doesn't hold up indexing.
+            # Failed lookups stay unresolved and are retried on the next ingest.
+            resolved = 0
+            for photo_id, lat, lon in get_unresolved_photo_locations():
+                city, country = self.geocode_cache.resolve(lat, lon)
+                if city and country:
+                    set_photo_location(photo_id, city, country)
+                    resolved += 1
             
-            # Format location string
-            location_info = ""
-            if city and country:
-                location_info = f"📍 **Location:** {city}, {country}"
-            # elif exif_data.get('DateTime'):
-            #     location_info = f"📅 **Date:** {exif_data['DateTime']}"
+            if added or missing or derivatives or queued or resolved:
+                stats = self.geocode_cache.get_stats()
+                print(f"Photo index: added {added}, removed {len(missing)}, {duplicates} duplicates, queued {queued}, "
+                      f"generated {derivatives} derivatives, resolved {resolved} locations "
+                      f"(geocode cache: {stats['memory_hits']} memory hits, {stats['db_hits']} DB hits, "
+                      f"{stats['misses']} misses, {stats['negative_hits']} cached failures)")
+        except Exception as e:
+            print(f"Error ingesting photos: {e}")
+
+    def find_duplicates(self, pool, rebuild=True):
+        """Hash new photos in the process pool and link near-duplicates to the photo they copy.
+        
+        Clusters are rebuilt from all hashes whenever photos were added or removed, so removing a
+        photo lets its duplicates back in. Photos that were already revealed are kept over unrevealed
+        ones, then older photos over newer ones. Returns how many photos are duplicates.
+        """
+        photos = get_photo_hashes()
+        unhashed = [photo for photo in photos if photo[3] is None]
+        hashes = {photo_id: to_unsigned(phash) for photo_id, _, _, phash, _ in photos if phash is not None}
+        
+        if unhashed:
+            paths = [os.path.join(self.revealed_dir if revealed else self.photos_dir, filename)
+                     for _, filename, revealed, _, _ in unhashed]
+            for (photo_id, _, _, _, _), value in zip(unhashed, pool.map(compute_dhash, paths, chunksize=32)):
+                if value is not None:
+                    hashes[photo_id] = value
+        elif not rebuild:
+            return sum(1 for photo in photos if photo[4] is not None)
+        
+        index = HammingIndex(self.duplicate_distance)
+        links = {}
+        for photo_id, _, revealed, _, _ in sorted(photos, key=lambda photo: (not photo[2], photo[0])):
+            value = hashes.get(photo_id)
+            if value is None:
+                continue
+            match = index.find(value)
+            if match:
+                links[photo_id] = match[1]
             else:
-                location_info = "📍 **Location:** Unknown"
-            
-            # Move the photo to revealed directory
-            revealed_path = os.path.join(self.revealed_dir, random_photo)
-            shutil.move(photo_path, revealed_path)
-            
-            return revealed_path, location_info
+                index.add(value, photo_id)
+        
+        changes = [
+            (to_signed(hashes[photo_id]) if photo_id in hashes else None, links.get(photo_id), photo_id)
+            for photo_id, _, _, phash, duplicate_of in photos
+            if duplicate_of != links.get(photo_id) or (phash is None and photo_id in hashes)
+        ]
+        if changes:
+            set_photo_hashes(changes)
+        return len(links)
+
+    def generate_derivatives(self, pool):
+        """Create Discord-sized copies of unrevealed photos in the process pool. Returns how many were created"""
+        jobs = get_photos_without_derivative()
+        if not jobs:
+            return 0
+        
+        os.makedirs(self.derivatives_dir, exist_ok=True)
+        created = []
+        futures = {
+            pool.submit(
+                make_derivative,
+                os.path.join(self.photos_dir, filename),
+                os.path.join(self.derivatives_dir, derivative_name(filename)),
+                self.derivative_max_dimension,
+                self.derivative_quality
+            ): (photo_id, filename)
+            for photo_id, filename in jobs
+        }
+        for future in as_completed(futures):
+            photo_id, filename = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                # The original is sent instead
+                print(f"Error creating derivative for photo {filename}: {e}")
+                continue
+            created.append((derivative_name(filename), photo_id))
+            if len(created) % self.INGEST_BATCH_SIZE == 0:
+                set_photo_derivatives(created[-self.INGEST_BATCH_SIZE:])
+        
+        remaining = created[len(created) - len(created) % self.INGEST_BATCH_SIZE:]
+        if remaining:
+            set_photo_derivatives(remaining)
+        return len(created)
+
+    def get_random_photo_info(self):
+        """Claim the next unrevealed photo from the shuffled queue and move it to revealed.
+        
+        Returns the path of the file to send, the location text and (total, revealed) counts as of the claim.
+        Runs in a worker thread, since it may have to make a missing derivative.
+        """
+        try:
+            while True:
+                photo = claim_random_photo()
+                if photo is None:
+                    if self.ingest_task and not self.ingest_task.done():
+                        return None, "Photos are still being indexed. Please try again in a moment!", None
+                    return None, "You have seen all the photos. Stay tuned for more!", None
+                
+                photo_path = os.path.join(self.photos_dir, photo['filename'])
+                if not os.path.exists(photo_path):
+                    # The file was removed after it was indexed, try the next one
+                    delete_photos([photo['filename']])
+                    self.catalog.remove(photo['filename'])
+                    continue
+                
+                # Format location string
+                if photo['city'] and photo['country']:
+                    location_info = f"📍 **Location:** {photo['city']}, {photo['country']}"
+                else:
+                    location_info = "📍 **Location:** Unknown"
+                
+                # Move the photo to revealed directory
+                revealed_path = os.path.join(self.revealed_dir, photo['filename'])
+                shutil.move(photo_path, revealed_path)
+                self.catalog.mark_revealed(photo['filename'])
+                
+                counts = (photo['total_photos'], photo['revealed_photos'])
+                
+                # GIFs are sent as is to keep animations (GIF has no EXIF to leak)
+                if photo['filename'].lower().endswith('.gif'):
+                    return revealed_path, location_info, counts
+                
+                # Send the smaller copy. Never the original, whose EXIF includes the exact GPS position:
+                # if the copy has gone missing, make it again now
+                derivative = photo['derivative'] or derivative_name(photo['filename'])
+                derivative_path = os.path.join(self.derivatives_dir, derivative)
+                if not os.path.exists(derivative_path):
+                    os.makedirs(self.derivatives_dir, exist_ok=True)
+                    make_derivative(revealed_path, derivative_path, self.derivative_max_dimension, self.derivative_quality)
+                    set_photo_derivatives([(derivative, photo['id'])])
+                return derivative_path, location_info, counts
             
         except Exception as e:
             print(f"Error getting random photo: {e}")
-            return None, f"Error accessing photos: {str(e)}"
+            return None, f"Error accessing photos: {str(e)}", None
 
     @app_commands.command(name='photo', description='Spend 500 coins to get a random photo from Object\'s phone!')
     async def random_photo(self, interaction: discord.Interaction):
@@ -191,7 +418,7 @@ class PhotosCog(commands.Cog):
             return
         
         # Get random photo
-        photo_path, location_info = self.get_random_photo_info()
+        photo_path, location_info, photo_counts = await asyncio.to_thread(self.get_random_photo_info)
         
         if photo_path is None:
             # Refund the coins if photo retrieval failed
@@ -205,8 +432,8 @@ class PhotosCog(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        # Get photo counts
-        total_photos, revealed_photos = self.get_photo_counts()
+        # Photo counts as of this reveal
+        total_photos, revealed_photos = photo_counts
 
         # Get the user to mention
         photo_mention_user_id = os.getenv('OWNER_USER_ID')
@@ -218,6 +445,7 @@ class PhotosCog(commands.Cog):
             description=f"Here's a random photo from {mention_text}'s phone!\n\n{location_info}\n\n💰 **Cost:** {required_coins} coins\n💳 **Balance:** {current_coins - required_coins} coins",
             color=0x4ecdc4
         )
+        embed.set_footer(text=f"{revealed_photos}/{total_photos} photos revealed")
         
         # Send the photo embedded in the message
         try:
@@ -237,5 +465,16 @@ class PhotosCog(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
+    def cog_unload(self):
+        """Clean up when cog is unloaded"""
+        if self.observer:
+            self.observer.stop()
+            self.observer = None
+        if self.reconcile_task:
+            self.reconcile_task.cancel()
+        if self.debounce_handle:
+            self.debounce_handle.cancel()
+
+
 async def setup(bot):
     await bot.add_cog(PhotosCog(bot))
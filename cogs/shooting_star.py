@@ -1,46 +1,87 @@
 import discord
-from discord.ext import commands, tasks
+from discord import app_commands
+from discord.ext import commands
 import random
 import asyncio
 import datetime
 import os
 import json
-from utils.database import add_coins
+import time
+from utils.activity import weighted_sample
+from utils.database import (
+    add_coins,
+    get_shooting_star_schedule,
+    save_shooting_star_schedule,
+    mark_shooting_star_event_completed,
+    record_shooting_star_catch,
+    get_fastest_catches,
+    get_top_star_catchers,
+    get_user_star_stats,
+    get_catch_latency_histogram,
+    get_shooting_star_history,
+    catch_latency_bucket_upper_ms
+)
 
 
 class ShootingStarCog(commands.Cog):
     """Cog for handling shooting star events"""
     
+    # How long users have to catch a shooting star
+    STAR_DURATION_SECONDS = 60
+    # Longest single sleep of the scheduler
+    MAX_SLEEP_SECONDS = 3600
+    # How long after a catch late attempts at the same word are still cleaned up
+    LATE_CATCH_WINDOW_SECONDS = 10
+    # How long to collect messages before deleting them in one bulk request
+    DELETE_BATCH_DELAY_SECONDS = 1.5
+    # Activity weight every channel and hour gets when picking event times, so nothing is ruled out
+    ACTIVITY_PRIOR = 1.0
+    
     def __init__(self, bot):
         self.bot = bot
-        self.shooting_star_active = False
-        self.current_message = ""
-        self.current_channel = None
-        self.shooting_star_msg = None  # Store reference to the shooting star message
+        # Active stars keyed by channel ID. Each value is a dict with the star's word, message and expiry task
+        self.active_stars = {}
+        # Recently caught stars keyed by channel ID, so late attempts can be cleaned up
+        self.recent_catches = {}
+        # Messages waiting to be bulk deleted, and the task that will delete them, keyed by channel ID
+        self.pending_deletions = {}
+        self.deletion_tasks = {}
         self.possible_messages = ["inertia", "bubbly", "object", "slime", "ithaca", "betty"]
-        self.SCHEDULE_FILE = 'shooting_star_schedule.json'
+        self.SCHEDULE_FILE = 'shooting_star_schedule.json'  # Legacy schedule file, only read to migrate it
+        self.schedule = None  # In-memory copy of today's schedule
+        self.channel_ids = self.load_channel_ids()
+        self.events_per_day = self.load_int_setting('SHOOTING_STAR_EVENTS_PER_DAY', 6, 1, 24 * 60)
+        self.channels_per_event = self.load_int_setting('SHOOTING_STAR_CHANNELS_PER_EVENT', 1, 1, max(len(self.channel_ids), 1))
+        self.scheduler_task = None
+        self.bot.assets.register('shooting_star', 'image.png', url=os.getenv('SHOOTING_STAR_IMAGE_URL'), filename='shooting_star.png')
 
-    def load_schedule(self):
-        """Load schedule from file"""
+    def load_schedule(self, date):
+        """Load a day's schedule from the database, migrating it from the legacy JSON file if needed"""
+        events = get_shooting_star_schedule(date)
+        if events:
+            return {'date': date, 'events': events}
+        
         try:
             with open(self.SCHEDULE_FILE, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
+                legacy_schedule = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        
+        if legacy_schedule.get('date') != date:
             return None
+        
+        self.save_schedule(legacy_schedule)
+        print(f"Migrated shooting star schedule for {date} from {self.SCHEDULE_FILE}")
+        return legacy_schedule
 
     def save_schedule(self, schedule):
-        """Save schedule to file"""
-        with open(self.SCHEDULE_FILE, 'w') as f:
-            json.dump(schedule, f, indent=2)
+        """Save a newly generated schedule to the database, storing each event's row ID on the event"""
+        save_shooting_star_schedule(schedule['date'], schedule['events'])
 
     def generate_daily_schedule(self, channel_ids):
-        """Generate a new daily schedule with predetermined channels and messages"""
+        """Generate a new daily schedule, picking times and channels weighted by recent message activity"""
         today = datetime.date.today().isoformat()
         
-        # Shuffle channels to randomize the order
-        shuffled_channels = channel_ids.copy()
-        random.shuffle(shuffled_channels)
-        
         # Shuffle messages to ensure each one is used once
         shuffled_messages = self.possible_messages.copy()
         random.shuffle(shuffled_messages)
@@ -50,32 +91,41 @@ class ShootingStarCog(commands.Cog):
             'events': []
         }
 
-        used_hours = set()
+        # Activity weights per channel and hour, plus a prior so quiet hours and new channels still get picked
+        self.bot.message_activity.flush()
+        activity = self.bot.message_activity.get_weights(channel_ids)
+        slot_weights = {
+            channel_id: [weight + self.ACTIVITY_PRIOR for weight in activity[channel_id]]
+            for channel_id in channel_ids
+        }
+        hour_weights = [sum(slot_weights[channel_id][hour] for channel_id in channel_ids) for hour in range(24)]
+
+        # Pick distinct times: one per hour while that's possible, otherwise distinct minutes of the day
+        if self.events_per_day <= 24:
+            hours = weighted_sample(range(24), hour_weights, self.events_per_day, random)
+            times = [(hour, random.randint(0, 59)) for hour in hours]
+        else:
+            minutes = weighted_sample(range(24 * 60), [hour_weights[m // 60] for m in range(24 * 60)],
+                                      self.events_per_day, random)
+            times = [divmod(minute_of_day, 60) for minute_of_day in minutes]
         
-        # Generate 6 random times and assign channels and messages
-        for i in range(6):
-            # Random hour between 0 and 23
-            hour = random.randint(0, 23)
-            while hour in used_hours:
-                hour = random.randint(0, 23)
-            used_hours.add(hour)
-            
-            # Random minute
-            minute = random.randint(0, 59)
-            
-            # Use modulo to cycle through channels if there are fewer than 6
-            channel_id = shuffled_channels[i % len(shuffled_channels)]
-            
-            # Use each message once (shuffled order)
-            message = shuffled_messages[i % len(shuffled_messages)]
-            
-            event = {
-                'time': f"{hour:02d}:{minute:02d}",
-                'channel_id': channel_id,
-                'message': message,
-                'completed': False
-            }
-            schedule['events'].append(event)
+        # Each time slot spawns stars in channels_per_event different channels, favouring the busiest ones
+        i = 0
+        for hour, minute in times:
+            channels = weighted_sample(channel_ids, [slot_weights[channel_id][hour] for channel_id in channel_ids],
+                                       self.channels_per_event, random)
+            for channel_id in channels:
+                # Use each message once (shuffled order)
+                message = shuffled_messages[i % len(shuffled_messages)]
+                i += 1
+                
+                event = {
+                    'time': f"{hour:02d}:{minute:02d}",
+                    'channel_id': channel_id,
+                    'message': message,
+                    'completed': False
+                }
+                schedule['events'].append(event)
         
         # Sort events by time
         schedule['events'].sort(key=lambda x: x['time'])
@@ -84,9 +134,14 @@ class ShootingStarCog(commands.Cog):
 
     def get_current_schedule(self, channel_ids):
         """Get or generate the current day's schedule"""
-        schedule = self.load_schedule()
         today = datetime.date.today().isoformat()
         
+        # The schedule is cached in memory and only read from disk on startup or at day rollover
+        if self.schedule and self.schedule.get('date') == today:
+            return self.schedule
+        
+        schedule = self.load_schedule(today)
+        
         # If no schedule exists or it's for a different day, generate new one
         if not schedule or schedule.get('date') != today:
             schedule = self.generate_daily_schedule(channel_ids)
@@ -98,70 +153,135 @@ class ShootingStarCog(commands.Cog):
             for desc in event_descriptions:
                 print(f"  {desc}")
         
+        self.schedule = schedule
         return schedule
 
+    def get_event_datetime(self, schedule, event):
+        """Get the local datetime an event is scheduled for"""
+        hour, minute = map(int, event['time'].split(':'))
+        day = datetime.date.fromisoformat(schedule['date'])
+        return datetime.datetime.combine(day, datetime.time(hour, minute))
+
     def get_next_event(self, schedule):
-        """Get the next uncompleted event"""
-        now = datetime.datetime.now()
-        
+        """Get the next uncompleted event and its scheduled datetime, or (None, None) if none are left"""
         for event in schedule['events']:
             if not event['completed']:
-                # Parse event time
-                hour, minute = map(int, event['time'].split(':'))
-                event_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-                
-                if event_time <= now:
-                    return event
-        
-        return None
-
-    def mark_event_completed(self, schedule, event):
-        """Mark an event as completed and save the schedule"""
-        for e in schedule['events']:
-            if e['time'] == event['time'] and e['channel_id'] == event['channel_id']:
-                e['completed'] = True
-                break
-        self.save_schedule(schedule)
-
-    @tasks.loop(minutes=1)  # Check every minute
-    async def shooting_star_task(self):
-        """Main task loop for shooting star events"""
+                return event, self.get_event_datetime(schedule, event)
+        
+        return None, None
+
+    def get_due_events(self, schedule, now):
+        """Get all uncompleted events whose time has come"""
+        return [event for event in schedule['events']
+                if not event['completed'] and self.get_event_datetime(schedule, event) <= now]
+
+    def mark_event_completed(self, schedule, event, started=True):
+        """Mark an event as completed, updating only that event's row. Skipped events aren't marked as started"""
+        event['completed'] = True
+        mark_shooting_star_event_completed(event['id'], started)
+
+    def is_star_word(self, channel_id, content):
+        """Check whether a message in a channel matches that channel's active shooting star word"""
+        star = self.active_stars.get(channel_id)
+        return star is not None and content.lower() == star['word_lower']
+
+    def load_int_setting(self, name, default, minimum, maximum):
+        """Read an integer setting from the environment, clamped to a range"""
+        value = os.getenv(name)
+        if not value:
+            return default
+        try:
+            return max(minimum, min(int(value), maximum))
+        except ValueError:
+            print(f"Invalid {name} value {value!r}, using {default}")
+            return default
+
+    def load_channel_ids(self):
+        """Parse the shooting star channel IDs from the environment"""
         # Get the channel IDs from environment variable
         channel_ids_str = os.getenv('SHOOTING_STAR_CHANNEL', '')
         if not channel_ids_str:
-            print("Please set CHANNEL_IDS in your .env file (comma-separated list of channel IDs)")
-            return
+            print("Please set SHOOTING_STAR_CHANNEL in your .env file (comma-separated list of channel IDs)")
+            return []
         
         # Parse channel IDs from comma-separated string
         try:
-            channel_ids = [int(cid.strip()) for cid in channel_ids_str.split(',')]
+            return [int(cid.strip()) for cid in channel_ids_str.split(',')]
         except ValueError:
-            print("Invalid CHANNEL_IDS format. Please use comma-separated channel IDs")
-            return
-        
-        # Get current schedule
-        schedule = self.get_current_schedule(channel_ids)
-        
-        # Check if it's time for the next event
-        next_event = self.get_next_event(schedule)
-        if not next_event:
-            return  # No more events today
+            print("Invalid SHOOTING_STAR_CHANNEL format. Please use comma-separated channel IDs")
+            return []
+
+    def start_scheduler(self):
+        """Start the shooting star scheduler if it isn't already running"""
+        if self.scheduler_task is None or self.scheduler_task.done():
+            self.scheduler_task = asyncio.create_task(self.run_scheduler())
+
+    async def run_scheduler(self):
+        """Sleep until each scheduled event is due and start it, moving to the next day's schedule at rollover"""
+        await self.bot.wait_until_ready()
         
-        # Mark this event as completed
-        self.mark_event_completed(schedule, next_event)
+        if not self.channel_ids:
+            return
         
+        while True:
+            try:
+                schedule = self.get_current_schedule(self.channel_ids)
+                next_event, event_time = self.get_next_event(schedule)
+                now = datetime.datetime.now()
+                
+                if next_event is None:
+                    # No more events today, wake up for the next day's schedule
+                    wake_at = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+                elif event_time > now:
+                    wake_at = event_time
+                else:
+                    # Events missed by more than a star's lifetime (e.g. while the bot was down) are skipped, and a
+                    # channel only holds one star at a time, so each channel starts just its latest due event.
+                    # Different channels start at once
+                    due_events = {}
+                    for event in self.get_due_events(schedule, now):
+                        overdue = (now - self.get_event_datetime(schedule, event)).total_seconds()
+                        if overdue > self.STAR_DURATION_SECONDS:
+                            self.mark_event_completed(schedule, event, started=False)
+                            continue
+                        skipped = due_events.get(event['channel_id'])
+                        if skipped is not None:
+                            self.mark_event_completed(schedule, skipped, started=False)
+                        due_events[event['channel_id']] = event
+                    due_events = list(due_events.values())
+                    for event in due_events:
+                        self.mark_event_completed(schedule, event)
+                    results = await asyncio.gather(*(self.start_shooting_star(event) for event in due_events),
+                                                   return_exceptions=True)
+                    for event, result in zip(due_events, results):
+                        if isinstance(result, Exception):
+                            print(f"Error starting shooting star for {event['time']} in channel {event['channel_id']}: {result}")
+                    continue
+                
+                # Sleep in chunks of at most an hour so wall clock adjustments (e.g. DST) are picked up
+                await asyncio.sleep(min((wake_at - now).total_seconds(), self.MAX_SLEEP_SECONDS))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in shooting star scheduler: {e}")
+                await asyncio.sleep(60)
+
+    async def start_shooting_star(self, event):
+        """Send a shooting star for an event and start its expiry timer"""
         # Get the predetermined channel
-        channel = self.bot.get_channel(next_event['channel_id'])
+        channel = self.bot.get_channel(event['channel_id'])
         if not channel:
-            print(f"Could not find channel with ID {next_event['channel_id']}")
+            print(f"Could not find channel with ID {event['channel_id']}")
             return
         
-        self.current_channel = channel
-        self.current_message = next_event['message']  # Use the predetermined message
-        self.shooting_star_active = True
+        # A channel only holds one star at a time, so an older one still up in this channel fades first
+        await self.end_shooting_star(channel.id)
         
+        word = event['message']  # Use the predetermined message
         now = datetime.datetime.now()
-        print(f"Starting shooting star event in channel {channel.name} at {now.strftime('%H:%M:%S')} (scheduled for {next_event['time']}, message: {self.current_message})")
+        print(f"Starting shooting star event in channel {channel.name} at {now.strftime('%H:%M:%S')} (scheduled for {event['time']}, message: {word})")
+        if self.bot.event_trace:
+            self.bot.event_trace.record('star', channel_id=channel.id, word=word)
         
         embed = discord.Embed(
             title="🌠 A Shooting Star Appears!",
@@ -170,28 +290,110 @@ class ShootingStarCog(commands.Cog):
         )
         embed.add_field(
             name="🌟 Catch the Shooting Star!",
-            value=f"Type `{self.current_message}` to catch it! 🌟\nHurry, time's running out! ⏳",
+            value=f"Type `{word}` to catch it! 🌟\nHurry, time's running out! ⏳",
             inline=False
         )
-        embed.set_footer(text="You have 60 seconds to catch it!")
+        embed.set_footer(text=f"You have {self.STAR_DURATION_SECONDS} seconds to catch it!")
         
-        # Attach the image to the embed
-        with open('image.png', 'rb') as f:
-            file = discord.File(f, filename='shooting_star.png')
-            embed.set_image(url='attachment://shooting_star.png')
-            self.shooting_star_msg = await channel.send(embed=embed, file=file)
+        # Use the cached image URL, or attach the image if no URL is available
+        file = await self.bot.assets.attach(embed, 'shooting_star')
+        shooting_star_msg = await channel.send(embed=embed, file=file)
         
-        # Wait 60 seconds for responses
-        await asyncio.sleep(60)
+        self.activate_star(channel, word, shooting_star_msg, event.get('id'))
+
+    def activate_star(self, channel, word, shooting_star_msg, event_id=None):
+        """Register a sent shooting star as catchable in its channel and start its expiry timer"""
+        star = {
+            'word': word,
+            'word_lower': word.lower(),
+            'channel': channel,
+            'message': shooting_star_msg,
+            'event_id': event_id,
+            'spawned_at': shooting_star_msg.created_at,
+            'expiry_task': None
+        }
+        previous = self.active_stars.get(channel.id)
+        if previous:
+            # Another star in this channel was sent concurrently, let it fade
+            previous['expiry_task'].cancel()
+            asyncio.create_task(self.delete_star_message(previous))
+        self.active_stars[channel.id] = star
+        # Expire the star on its own timer so the scheduler and other channels keep going
+        star['expiry_task'] = asyncio.create_task(self.expire_shooting_star(channel.id, star))
+        return star
+
+    async def expire_shooting_star(self, channel_id, star):
+        """Remove the shooting star if nobody caught it in time"""
+        await asyncio.sleep(self.STAR_DURATION_SECONDS)
         
-        if self.shooting_star_active:
+        if self.active_stars.get(channel_id) is star:
             # No one caught it - delete the shooting star message
-            if self.shooting_star_msg:
-                try:
-                    await self.shooting_star_msg.delete()
-                except discord.NotFound:
-                    pass  # Message already deleted
-            self.shooting_star_active = False
+            del self.active_stars[channel_id]
+            await self.delete_star_message(star)
+
+    async def end_shooting_star(self, channel_id):
+        """End a channel's active star early, deleting its message"""
+        star = self.active_stars.pop(channel_id, None)
+        if star:
+            star['expiry_task'].cancel()
+            await self.delete_star_message(star)
+
+    async def delete_star_message(self, star):
+        """Delete a star's message, ignoring it if it's already gone"""
+        try:
+            await star['message'].delete()
+        except discord.NotFound:
+            pass  # Message already deleted
+
+    def claim_star(self, message):
+        """Claim the message's channel's star if the message matches its word. Returns the star or None.
+
+        This never awaits, so no other message can see the star between the check and the claim.
+        """
+        star = self.active_stars.get(message.channel.id)
+        if star is None or message.content.lower() != star['word_lower']:
+            return None
+        del self.active_stars[message.channel.id]
+        return star
+
+    def collect_late_catch(self, message):
+        """Queue a message for deletion if it's a late attempt at a star that was just caught"""
+        recent = self.recent_catches.get(message.channel.id)
+        if recent is None:
+            return
+        if time.monotonic() > recent['until']:
+            del self.recent_catches[message.channel.id]
+            return
+        if message.content.lower() == recent['word_lower']:
+            self.queue_deletion(message)
+
+    def queue_deletion(self, message):
+        """Delete a message in the channel's next bulk delete"""
+        channel_id = message.channel.id
+        self.pending_deletions.setdefault(channel_id, []).append(message)
+        if channel_id not in self.deletion_tasks:
+            self.deletion_tasks[channel_id] = asyncio.create_task(self.flush_deletions(message.channel))
+
+    async def flush_deletions(self, channel):
+        """After a short delay, delete the channel's queued messages with as few requests as possible"""
+        try:
+            await asyncio.sleep(self.DELETE_BATCH_DELAY_SECONDS)
+        finally:
+            self.deletion_tasks.pop(channel.id, None)
+            messages = self.pending_deletions.pop(channel.id, [])
+        
+        # Bulk delete takes 2 to 100 messages per request
+        for i in range(0, len(messages), 100):
+            batch = messages[i:i + 100]
+            try:
+                if len(batch) == 1:
+                    await batch[0].delete()
+                else:
+                    await channel.delete_messages(batch)
+            except discord.NotFound:
+                pass  # Some messages were already deleted
+            except discord.HTTPException as e:
+                print(f"Error deleting {len(batch)} shooting star messages in channel {channel.id}: {e}")
 
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -200,79 +402,182 @@ class ShootingStarCog(commands.Cog):
         if message.author == self.bot.user:
             return
         
-        # Check if shooting star is active and message matches
-        if self.shooting_star_active and message.content.lower() == self.current_message.lower():
-            self.shooting_star_active = False
+        # Claim the star before anything is awaited, so only one message can ever win it
+        star = self.claim_star(message)
+        if star is None:
+            self.collect_late_catch(message)
+            return
 
-            if self.shooting_star_msg:
-                try:
-                    await self.shooting_star_msg.delete()
-                except discord.NotFound:
-                    pass  # Message already deleted
+        star['expiry_task'].cancel()
+        catch_latency_ms = max(0, int((message.created_at - star['spawned_at']).total_seconds() * 1000))
+        self.recent_catches[message.channel.id] = {
+            'word_lower': star['word_lower'],
+            'until': time.monotonic() + self.LATE_CATCH_WINDOW_SECONDS
+        }
 
-            try:
-                await message.delete()
-            except discord.NotFound:
-                pass  # Message already deleted
-                        
-            # Add coins to the user
-            user_id = message.author.id
-            username = message.author.display_name
-            
-            # Check for Twitch subscriber multipliers
-            multiplier = 1.0
-            
-            # Server owner always gets 1x multiplier
-            owner_user_id = os.getenv('OWNER_USER_ID')
-            if owner_user_id and str(user_id) == str(owner_user_id):
-                multiplier = 1.0
-            else:
-                # Check for Twitch subscriber roles
-                member = message.guild.get_member(user_id)
-                if member:
-                    twitch_tier_1_role_id = os.getenv('TWITCH_TIER_1_ROLE_ID')
-                    twitch_tier_2_role_id = os.getenv('TWITCH_TIER_2_ROLE_ID')
-                    twitch_tier_3_role_id = os.getenv('TWITCH_TIER_3_ROLE_ID')
-
-                    roles = member.roles
-                    tier_1_role = discord.utils.get(message.guild.roles, id=int(twitch_tier_1_role_id)) if twitch_tier_1_role_id else None
-                    tier_2_role = discord.utils.get(message.guild.roles, id=int(twitch_tier_2_role_id)) if twitch_tier_2_role_id else None
-                    tier_3_role = discord.utils.get(message.guild.roles, id=int(twitch_tier_3_role_id)) if twitch_tier_3_role_id else None
+        await self.delete_star_message(star)
+        # The winning message is deleted together with any late attempts
+        self.queue_deletion(message)
                     
-                    if tier_3_role and tier_3_role in roles:
-                        multiplier = 2.0
-                    elif tier_2_role and tier_2_role in roles:
-                        multiplier = 1.4
-                    elif tier_1_role and tier_1_role in roles:
-                        multiplier = 1.2
-            
-            # Calculate coin amount with multiplier
-            base_coins = 100
-            total_coins_earned = int(base_coins * multiplier)
-            
-            add_coins(user_id, username, total_coins_earned)
-            
-            # Get updated coin count
-            from utils.database import get_user_coins
-            total_coins = get_user_coins(user_id)
+        # Add coins to the user
+        user_id = message.author.id
+        username = message.author.display_name
+        
+        # Check for Twitch subscriber multipliers
+        multiplier = 1.0
+        
+        # Server owner always gets 1x multiplier
+        owner_user_id = os.getenv('OWNER_USER_ID')
+        if owner_user_id and str(user_id) == str(owner_user_id):
+            multiplier = 1.0
+        else:
+            # Check for Twitch subscriber roles
+            member = message.guild.get_member(user_id)
+            if member:
+                twitch_tier_1_role_id = os.getenv('TWITCH_TIER_1_ROLE_ID')
+                twitch_tier_2_role_id = os.getenv('TWITCH_TIER_2_ROLE_ID')
+                twitch_tier_3_role_id = os.getenv('TWITCH_TIER_3_ROLE_ID')
+
+                roles = member.roles
+                tier_1_role = discord.utils.get(message.guild.roles, id=int(twitch_tier_1_role_id)) if twitch_tier_1_role_id else None
+                tier_2_role = discord.utils.get(message.guild.roles, id=int(twitch_tier_2_role_id)) if twitch_tier_2_role_id else None
+                tier_3_role = discord.utils.get(message.guild.roles, id=int(twitch_tier_3_role_id)) if twitch_tier_3_role_id else None
+                
+                if tier_3_role and tier_3_role in roles:
+                    multiplier = 2.0
+                elif tier_2_role and tier_2_role in roles:
+                    multiplier = 1.4
+                elif tier_1_role and tier_1_role in roles:
+                    multiplier = 1.2
+        
+        # Calculate coin amount with multiplier
+        base_coins = 100
+        total_coins_earned = int(base_coins * multiplier)
+        
+        add_coins(user_id, username, total_coins_earned)
+        record_shooting_star_catch(star['event_id'], user_id, message.channel.id, star['word'], catch_latency_ms)
+        print(f"Shooting star caught by {username} in {catch_latency_ms} ms")
+        
+        # Get updated coin count
+        from utils.database import get_user_coins
+        total_coins = get_user_coins(user_id)
+        
+        embed = discord.Embed(
+            title="🌟 Shooting Star Caught!",
+            description=f"Congratulations {message.author.mention}! You caught the shooting star! ✨",
+            color=0x00ff00
+        )
+        embed.add_field(
+            name="💰 Reward",
+            value=f"You earned **{total_coins_earned} coins**!\nTotal coins: **{total_coins}**",
+            inline=False
+        )
+        embed.set_footer(text=f"Caught in {catch_latency_ms / 1000:.2f}s at {datetime.datetime.now(datetime.UTC).strftime('%H:%M:%S')} UTC")
+        
+        await message.channel.send(embed=embed)
+
+    def latency_percentile(self, histogram, percentile):
+        """Estimate a latency percentile (ms) from histogram buckets. Returns None for an empty histogram"""
+        total = sum(count for _, count in histogram)
+        if not total:
+            return None
+        
+        target = percentile / 100 * total
+        running = 0
+        for bucket, count in histogram:
+            running += count
+            if running >= target:
+                return catch_latency_bucket_upper_ms(bucket)
+        return catch_latency_bucket_upper_ms(histogram[-1][0])
+
+    def format_percentiles(self, histogram):
+        """Format the median and 90th percentile catch times"""
+        p50 = self.latency_percentile(histogram, 50)
+        p90 = self.latency_percentile(histogram, 90)
+        if p50 is None:
+            return "No catches yet"
+        return f"Median: **≤ {p50 / 1000:.1f}s**\n90th percentile: **≤ {p90 / 1000:.1f}s**"
+
+    @app_commands.command(name='starstats', description='Show shooting star catch statistics')
+    @app_commands.describe(user='Show statistics for a specific user')
+    async def star_stats(self, interaction: discord.Interaction, user: discord.User = None):
+        """Show the fastest catches and top catchers, or one user's catch statistics"""
+        if user is not None:
+            stats = get_user_star_stats(user.id)
+            if not stats:
+                embed = discord.Embed(
+                    title="🌠 Shooting Star Stats",
+                    description=f"{user.mention} hasn't caught a shooting star yet!",
+                    color=0x00ffff
+                )
+                await interaction.response.send_message(embed=embed)
+                return
             
             embed = discord.Embed(
-                title="🌟 Shooting Star Caught!",
-                description=f"Congratulations {message.author.mention}! You caught the shooting star! ✨",
-                color=0x00ff00
+                title=f"🌠 {user.display_name}'s Shooting Star Stats",
+                description=f"**{stats['catches']}** shooting stars caught",
+                color=0x00ffff
             )
             embed.add_field(
-                name="💰 Reward",
-                value=f"You earned **{total_coins_earned} coins**!\nTotal coins: **{total_coins}**",
+                name="⚡ Reaction Time",
+                value=f"Best: **{stats['best_latency_ms'] / 1000:.2f}s**\nAverage: **{stats['average_latency_ms'] / 1000:.2f}s**",
                 inline=False
             )
-            embed.set_footer(text=f"Caught at {datetime.datetime.now(datetime.UTC).strftime('%H:%M:%S')} UTC")
-            
-            await message.channel.send(embed=embed)
+            embed.add_field(
+                name="📊 Percentiles",
+                value=self.format_percentiles(get_catch_latency_histogram(user.id)),
+                inline=False
+            )
+            await interaction.response.send_message(embed=embed)
+            return
+        
+        embed = discord.Embed(
+            title="🌠 Shooting Star Stats",
+            color=0x00ffff
+        )
+        
+        fastest = get_fastest_catches(5)
+        if fastest:
+            medals = ["🥇", "🥈", "🥉", "4.", "5."]
+            embed.add_field(
+                name="⚡ Fastest Catches",
+                value="\n".join(f"{medals[i]} <@{user_id}> - **{latency_ms / 1000:.2f}s** (`{word}`)"
+                                for i, (user_id, latency_ms, word, _) in enumerate(fastest)),
+                inline=False
+            )
+        
+        top_catchers = get_top_star_catchers(5)
+        if top_catchers:
+            embed.add_field(
+                name="🏆 Most Catches",
+                value="\n".join(f"{i}. <@{user_id}> - **{catches}** catches (avg {average_ms / 1000:.2f}s)"
+                                for i, (user_id, catches, average_ms, _) in enumerate(top_catchers, 1)),
+                inline=False
+            )
+        
+        embed.add_field(
+            name="📊 Reaction Time Percentiles",
+            value=self.format_percentiles(get_catch_latency_histogram()),
+            inline=False
+        )
+        
+        history = get_shooting_star_history(30)
+        started = sum(day[2] or 0 for day in history)
+        caught = sum(day[3] for day in history)
+        if started:
+            embed.set_footer(text=f"Last 30 days: {caught}/{started} stars caught ({caught / started:.0%})")
+        
+        await interaction.response.send_message(embed=embed)
 
     def cog_unload(self):
         """Clean up when cog is unloaded"""
-        self.shooting_star_task.cancel()
+        if self.scheduler_task:
+            self.scheduler_task.cancel()
+        for star in self.active_stars.values():
+            star['expiry_task'].cancel()
+        self.active_stars.clear()
+        for task in self.deletion_tasks.values():
+            task.cancel()
 
 
 async def setup(bot):
@@ -1,12 +1,10 @@
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
 import os
 import asyncio
-import httpx
 from datetime import datetime, timezone, timedelta
+from utils.lazy_import import lazy_import
 from utils.database import (
     add_sotd_song,
     get_random_unused_song,
@@ -14,6 +12,9 @@ from utils.database import (
     can_add_song
 )
 
+spotipy = lazy_import('spotipy')
+spotipy_oauth2 = lazy_import('spotipy.oauth2')
+
 
 class SotdCog(commands.Cog):
     """Cog for Song of the Day functionality"""
@@ -24,14 +25,19 @@ class SotdCog(commands.Cog):
         self.client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
         self.sotd_channel_id = int(os.getenv('SOTD_CHANNEL_ID')) if os.getenv('SOTD_CHANNEL_ID') else None
         
-        # Initialize Spotify client
-        if self.client_id and self.client_secret:
-            auth_manager = SpotifyClientCredentials(client_id=self.client_id, client_secret=self.client_secret)
-            self.spotify = spotipy.Spotify(auth_manager=auth_manager)
-        else:
-            self.spotify = None
+        # Spotify client is created on first use so loading the cog doesn't import spotipy
+        self._spotify = None
+        if not (self.client_id and self.client_secret):
             print("Warning: Spotify credentials not found. SOTD functionality will be limited.")
 
+    @property
+    def spotify(self):
+        """Get the Spotify client, creating it on first use. None if credentials are missing"""
+        if self._spotify is None and self.client_id and self.client_secret:
+            auth_manager = spotipy_oauth2.SpotifyClientCredentials(client_id=self.client_id, client_secret=self.client_secret)
+            self._spotify = spotipy.Spotify(auth_manager=auth_manager)
+        return self._spotify
+
     @commands.Cog.listener()
     async def on_ready(self):
         """Start the scheduled task when the cog is ready"""
@@ -232,17 +238,18 @@ class SotdCog(commands.Cog):
                 'songIfSingle': 'true'
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(api_url, params=params, timeout=10.0)
-                response.raise_for_status()
-                data = response.json()
-                
-                # Extract Apple Music and YouTube links
-                links_by_platform = data.get('linksByPlatform', {})
-                apple_music_url = links_by_platform.get('appleMusic', {}).get('url')
-                youtube_url = links_by_platform.get('youtube', {}).get('url')
-                
-                return apple_music_url, youtube_url
+            # Shared pooled client, so repeat calls reuse the connection (timeouts are set per service in utils/http.py)
+            client = self.bot.http_clients.get('songlink')
+            response = await client.get(api_url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            
+            # Extract Apple Music and YouTube links
+            links_by_platform = data.get('linksByPlatform', {})
+            apple_music_url = links_by_platform.get('appleMusic', {}).get('url')
+            youtube_url = links_by_platform.get('youtube', {}).get('url')
+            
+            return apple_music_url, youtube_url
         except Exception as e:
             print(f"Error fetching song links: {e}")
             return None, None
@@ -0,0 +1 @@
+# Empty __init__.py file to make tools a Python package
@@ -0,0 +1,218 @@
+"""Bulk photo import.
+
+Walks a source directory, validates every file with Pillow across a worker pool, converts
+formats /photo can't send (HEIC with pillow-heif installed, WebP, TIFF, ...) to JPEG, copies the
+result into photos/ and writes its EXIF metadata to the photos index in batched transactions.
+Files are identified by content hash, so an interrupted import can simply be run again. New rows
+can't be revealed yet: the bot's ingest dedupes them and makes their derivatives before adding them
+to the reveal queue, and resolves their locations.
+
+Usage (from the repository root, next to not_object.db):
+    python -m tools.ingest_photos ~/exports/phone
+    python -m tools.ingest_photos ~/exports/phone --workers 8 --batch-size 500
+"""
+import argparse
+import hashlib
+import io
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from PIL import Image, UnidentifiedImageError
+
+from utils.database import init_database, get_photo_content_hashes, save_photos
+from utils.photo_metadata import is_image_file, get_exif_data, get_gps_data, get_coordinates, get_taken_at
+
+try:
+    # Lets Pillow open HEIC/HEIF files from iPhones if it's installed
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    pass
+
+
+# Content hashes already in the index, set in each worker by init_worker
+_known_hashes = set()
+
+
+def init_worker(known_hashes):
+    """Give each worker the hashes of photos that were already imported"""
+    global _known_hashes
+    _known_hashes = known_hashes
+
+
+def safe_filename(name):
+    """Replace characters that break attachment:// URLs in embeds"""
+    return re.sub(r'[^A-Za-z0-9._-]', '_', name)
+
+
+def write_unique(photos_dir, name, data, content_hash):
+    """Write data to photos_dir without overwriting a different file. Returns the file name used.
+
+    A file with the same name and content counts as already written, which is what makes
+    re-running an interrupted import safe.
+    """
+    stem, ext = os.path.splitext(name)
+    # Converted files differ from the source, so compare against what's actually written
+    data_hash = hashlib.sha256(data).hexdigest()
+    tmp_path = os.path.join(photos_dir, f".{content_hash}.part")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    try:
+        for candidate in (name, f"{stem}_{content_hash[:8]}{ext}"):
+            path = os.path.join(photos_dir, candidate)
+            try:
+                # Atomic and fails if the name is taken, so concurrent workers can't clobber each other
+                os.link(tmp_path, path)
+                return candidate
+            except FileExistsError:
+                with open(path, 'rb') as f:
+                    if hashlib.sha256(f.read()).hexdigest() == data_hash:
+                        return candidate
+        raise FileExistsError(f"{name} and {stem}_{content_hash[:8]}{ext} already exist with different content")
+    finally:
+        os.remove(tmp_path)
+
+
+def prepare_photo(source_path, photos_dir, quality):
+    """Validate, convert and copy one file, and extract its metadata. Runs in a worker process"""
+    result = {'source': source_path, 'bytes': 0}
+    try:
+        with open(source_path, 'rb') as f:
+            data = f.read()
+        result['bytes'] = len(data)
+        result['content_hash'] = content_hash = hashlib.sha256(data).hexdigest()
+        if content_hash in _known_hashes:
+            return {**result, 'status': 'existing'}
+
+        try:
+            # verify() catches truncated files; the image has to be reopened afterwards
+            with Image.open(io.BytesIO(data)) as image:
+                image.verify()
+            image = Image.open(io.BytesIO(data))
+            image.load()
+        except UnidentifiedImageError:
+            return {**result, 'status': 'rejected', 'reason': "not an image Pillow can read"}
+        except Exception as e:
+            return {**result, 'status': 'rejected', 'reason': str(e) or type(e).__name__}
+
+        exif_data = get_exif_data(image)
+        name = safe_filename(os.path.basename(source_path))
+        if is_image_file(name):
+            status = 'imported'
+        else:
+            # Keep the EXIF so the bot can still read GPS from the converted file
+            status = 'converted'
+            name = f"{os.path.splitext(name)[0]}.jpg"
+            output = io.BytesIO()
+            exif_bytes = image.info.get('exif')
+            image.convert('RGB').save(output, 'JPEG', quality=quality, **({'exif': exif_bytes} if exif_bytes else {}))
+            data = output.getvalue()
+
+        lat, lon = get_coordinates(get_gps_data(exif_data))
+        return {
+            **result,
+            'status': status,
+            'filename': write_unique(photos_dir, name, data, content_hash),
+            'width': image.size[0],
+            'height': image.size[1],
+            'taken_at': get_taken_at(exif_data),
+            'latitude': lat,
+            'longitude': lon
+        }
+    except Exception as e:
+        return {**result, 'status': 'rejected', 'reason': str(e) or type(e).__name__}
+
+
+def find_files(source_dir):
+    """List files under a directory, skipping hidden ones"""
+    paths = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        paths.extend(os.path.join(root, f) for f in sorted(files) if not f.startswith('.'))
+    return paths
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import photos into photos/ and the photos index")
+    parser.add_argument('source', help="Directory to import photos from (searched recursively)")
+    parser.add_argument('--photos-dir', default='photos', help="Directory the bot serves photos from")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument('--batch-size', type=int, default=200, help="Photos written to the index per transaction")
+    parser.add_argument('--quality', type=int, default=95, help="JPEG quality for converted files")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    init_database()
+    os.makedirs(args.photos_dir, exist_ok=True)
+
+    sources = find_files(args.source)
+    known_hashes = get_photo_content_hashes()
+    print(f"Importing {len(sources)} files from {args.source} ({len(known_hashes)} photos already imported)")
+
+    stats = Counter()
+    imported = {}  # content hash -> file name, for files that appear twice in the source
+    batch = []
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(known_hashes,)) as pool:
+        results = pool.map(prepare_photo, sources, repeat(args.photos_dir), repeat(args.quality), chunksize=8)
+        for done, result in enumerate(results, 1):
+            stats['bytes'] += result['bytes']
+            status = result['status']
+
+            if status == 'rejected':
+                print(f"Rejected {result['source']}: {result['reason']}")
+            elif status in ('imported', 'converted'):
+                content_hash = result['content_hash']
+                if content_hash in imported:
+                    # Same file twice in the source; drop the extra copy if it landed under another name
+                    status = 'existing'
+                    if result['filename'] != imported[content_hash]:
+                        os.remove(os.path.join(args.photos_dir, result['filename']))
+                else:
+                    imported[content_hash] = result['filename']
+                    # save_photos leaves new rows out of the reveal queue until the bot's ingest has checked them
+                    batch.append({
+                        'filename': result['filename'],
+                        'width': result['width'],
+                        'height': result['height'],
+                        'taken_at': result['taken_at'],
+                        'latitude': result['latitude'],
+                        'longitude': result['longitude'],
+                        'city': None,
+                        'country': None,
+                        'location_resolved': 0 if result['latitude'] is not None else 1,
+                        'revealed': 0,
+                        'content_hash': content_hash
+                    })
+                    if len(batch) >= args.batch_size:
+                        save_photos(batch)
+                        batch = []
+            stats[status] += 1
+
+            if done % 500 == 0:
+                elapsed = time.perf_counter() - start
+                print(f"  {done}/{len(sources)} files, {done / elapsed:.1f} files/s")
+
+    if batch:
+        save_photos(batch)
+
+    elapsed = time.perf_counter() - start
+    megabytes = stats['bytes'] / (1024 * 1024)
+    print(f"Files:               {len(sources)} ({megabytes:.1f} MB) in {elapsed:.2f} s")
+    print(f"Imported:            {stats['imported'] + stats['converted']} ({stats['converted']} converted to JPEG)")
+    print(f"Already imported:    {stats['existing']}")
+    print(f"Rejected:            {stats['rejected']}")
+    if elapsed > 0:
+        print(f"Throughput:          {len(sources) / elapsed:.1f} files/s, {megabytes / elapsed:.1f} MB/s")
+    return stats
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,525 @@
+"""Offline gateway event replay harness.
+
+Replays a synthetic or recorded event stream through NotObjectBot in-process, using fake
+Discord objects and a stubbed HTTP layer, and reports throughput, DB calls per event and
+tail latency. Nothing touches the network and the database lives in a temporary directory.
+
+Usage (from the repository root):
+    python -m tools.replay_harness --messages 50000 --users 5000
+    python -m tools.replay_harness --trace events.jsonl
+    python -m tools.replay_harness --trace traces/ --speed 1   # a recorder directory, in real time
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from utils.event_trace import read_trace
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Fake role IDs so the Twitch multiplier lookups run against real roles
+TIER_ROLE_IDS = {
+    'TWITCH_TIER_1_ROLE_ID': 9001,
+    'TWITCH_TIER_2_ROLE_ID': 9002,
+    'TWITCH_TIER_3_ROLE_ID': 9003,
+}
+
+# Slash commands that are safe to replay offline (no external services involved)
+REPLAYABLE_COMMANDS = {'coins', 'daily', 'leaderboard'}
+
+_snowflakes = itertools.count(10**17)
+
+
+def next_snowflake():
+    return next(_snowflakes)
+
+
+# --- Fake Discord objects -------------------------------------------------------------
+
+class FakeRole:
+    def __init__(self, role_id, name):
+        self.id = role_id
+        self.name = name
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakeUser:
+    def __init__(self, user_id, name, bot=False, roles=None):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.bot = bot
+        self.roles = roles or []
+        self.mention = f"<@{user_id}>"
+        self.guild_permissions = FakePermissions()
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakePermissions:
+    administrator = False
+
+
+class FakeGuild:
+    def __init__(self, guild_id, roles):
+        self.id = guild_id
+        self.name = 'Replay Guild'
+        self.roles = roles
+        self.members = {}
+
+    def get_member(self, user_id):
+        return self.members.get(user_id)
+
+
+class FakeMessage:
+    def __init__(self, channel, author, content='', embed=None, created_at=None):
+        self.id = next_snowflake()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.embeds = [embed] if embed else []
+        self.attachments = []
+        self.reactions = []
+        self.created_at = created_at or datetime.datetime.now(datetime.timezone.utc)
+        self.jump_url = f"https://discord.com/channels/{channel.guild.id}/{channel.id}/{self.id}"
+        self.deleted = False
+        self._state = None
+
+    async def delete(self, delay=None):
+        self.channel.stats['deletes'] += 1
+        self.deleted = True
+
+    async def edit(self, **kwargs):
+        self.channel.stats['edits'] += 1
+        if 'content' in kwargs:
+            self.content = kwargs['content']
+        if 'embed' in kwargs:
+            self.embeds = [kwargs['embed']] if kwargs['embed'] else []
+        return self
+
+
+class FakeChannel:
+    def __init__(self, channel_id, guild):
+        self.id = channel_id
+        self.name = f"channel-{channel_id % 1000}"
+        self.guild = guild
+        self.mention = f"<#{channel_id}>"
+        self.stats = {'sends': 0, 'deletes': 0, 'bulk_deletes': 0, 'edits': 0}
+
+    async def send(self, content=None, embed=None, file=None, delete_after=None, **kwargs):
+        self.stats['sends'] += 1
+        return FakeMessage(self, FAKE_BOT_USER, content or '', embed=embed)
+
+    async def delete_messages(self, messages, reason=None):
+        self.stats['bulk_deletes'] += 1
+        for message in messages:
+            message.deleted = True
+
+    async def fetch_message(self, message_id):
+        return FakeMessage(self, FAKE_BOT_USER)
+
+
+class FakeInteractionResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def send_message(self, content=None, embed=None, file=None, ephemeral=False, **kwargs):
+        self._done = True
+        self.interaction.sent.append(embed or content)
+
+    async def defer(self, ephemeral=False, thinking=False):
+        self._done = True
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, embed=None, file=None, ephemeral=False, wait=True, **kwargs):
+        self.interaction.sent.append(embed or content)
+        return FakeMessage(self.interaction.channel, FAKE_BOT_USER, content or '', embed=embed)
+
+
+class FakeInteraction:
+    def __init__(self, user, channel):
+        self.id = next_snowflake()
+        self.user = user
+        self.guild = channel.guild
+        self.channel = channel
+        self.channel_id = channel.id
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self.response = FakeInteractionResponse(self)
+        self.followup = FakeFollowup(self)
+        self.sent = []
+
+
+FAKE_BOT_USER = FakeUser(1, 'NotObjectBot', bot=True)
+
+
+# --- Stubbed HTTP layer and DB call counting -------------------------------------------
+
+class StubHTTP:
+    """Replaces the bot's HTTP request method so nothing can reach Discord"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def request(self, route, **kwargs):
+        self.requests.append(f"{route.method} {route.path}")
+        return {}
+
+
+class DBCallCounter:
+    """Counts sqlite3 connections and executed statements while enabled"""
+
+    def __init__(self):
+        self.connections = 0
+        self.statements = 0
+        self.enabled = True
+        self._connect = sqlite3.connect
+
+    def install(self):
+        counter = self
+
+        def counting_connect(*args, **kwargs):
+            conn = counter._connect(*args, **kwargs)
+            if counter.enabled:
+                counter.connections += 1
+                conn.set_trace_callback(counter._on_statement)
+            return conn
+
+        sqlite3.connect = counting_connect
+
+    def uninstall(self):
+        sqlite3.connect = self._connect
+
+    def _on_statement(self, statement):
+        if self.enabled:
+            self.statements += 1
+
+
+# --- Event streams ---------------------------------------------------------------------
+
+def generate_synthetic_events(messages, users, channels, star_every, command_ratio, rollover_at, seed):
+    """Build a synthetic event stream of chat messages, slash commands, stars and one UTC rollover"""
+    rng = random.Random(seed)
+    words = ["inertia", "bubbly", "object", "slime", "ithaca", "betty"]
+    chatter = ["hello", "lol", "that was great", "pog", "anyone here?", "gm", "gn", "who is streaming tonight"]
+    user_ids = [1000 + i for i in range(users)]
+    channel_ids = [500 + i for i in range(channels)]
+    rollover_index = int(messages * rollover_at) if rollover_at is not None else None
+
+    events = []
+    star_catchers = 0
+    star_channel = None
+    star_word = None
+    for i in range(messages):
+        if i == rollover_index:
+            events.append({'type': 'rollover'})
+        if star_every and i % star_every == 0:
+            star_channel = rng.choice(channel_ids)
+            star_word = rng.choice(words)
+            star_catchers = rng.randint(5, 40)
+            events.append({'type': 'star', 'channel': star_channel, 'word': star_word})
+
+        user_id = rng.choice(user_ids)
+        if star_catchers and rng.random() < 0.5:
+            # A burst of people typing the star word in the star's channel
+            star_catchers -= 1
+            events.append({'type': 'message', 'user': user_id, 'channel': star_channel, 'content': star_word})
+        elif rng.random() < command_ratio:
+            events.append({'type': 'command', 'name': rng.choice(['coins', 'daily', 'leaderboard']),
+                           'user': user_id, 'channel': rng.choice(channel_ids)})
+        else:
+            events.append({'type': 'message', 'user': user_id, 'channel': rng.choice(channel_ids),
+                           'content': rng.choice(chatter)})
+    return events
+
+
+def load_trace_events(path):
+    """Load an event stream from a harness trace or an anonymized recorder trace (file or directory)"""
+    events = []
+    star_words = {}
+    skipped = 0
+    for entry in read_trace(path):
+        if 'type' in entry:
+            # Already in harness format
+            events.append(entry)
+            continue
+
+        kind = entry.get('e')
+        # Hashed IDs are truncated to 60 bits so they fit in a SQLite INTEGER
+        user_id = int(entry['u'][:15], 16) if 'u' in entry else None
+        channel_id = int(entry['c'][:15], 16) if 'c' in entry else None
+        if kind == 'star':
+            star_words[channel_id] = entry.get('w', 'object')
+            events.append({'type': 'star', 'channel': channel_id, 'word': star_words[channel_id], 't': entry['t']})
+        elif kind == 'message':
+            # Content isn't recorded, so rebuild it from its length or the star word it matched
+            content = star_words.get(channel_id, 'object') if entry.get('s') else 'x' * entry.get('n', 0)
+            events.append({'type': 'message', 'user': user_id, 'channel': channel_id, 'content': content, 't': entry['t']})
+        elif kind == 'command' and entry.get('x') in REPLAYABLE_COMMANDS:
+            events.append({'type': 'command', 'name': entry['x'], 'user': user_id, 'channel': channel_id, 't': entry['t']})
+        else:
+            skipped += 1
+
+    if skipped:
+        print(f"Skipped {skipped} recorded events that can't be replayed offline")
+    return events
+
+
+# --- Harness ---------------------------------------------------------------------------
+
+class ReplayHarness:
+    def __init__(self, bot, module):
+        self.bot = bot
+        self.module = module
+        self.roles = [FakeRole(role_id, name) for name, role_id in TIER_ROLE_IDS.items()]
+        self.guild = FakeGuild(42, self.roles)
+        self.channels = {}
+        self.users = {}
+        self.db = DBCallCounter()
+        self.http = StubHTTP()
+        self.latencies = {}
+        self.events = 0
+
+    async def setup(self):
+        self.bot.http.request = self.http.request
+        self.bot._connection.user = FAKE_BOT_USER
+        for extension in self.module.COGS:
+            await self.bot.load_extension(extension)
+        self.module.init_database()
+        self.db.install()
+
+    def channel(self, channel_id):
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            channel = self.channels[channel_id] = FakeChannel(channel_id, self.guild)
+        return channel
+
+    def user(self, user_id):
+        user = self.users.get(user_id)
+        if user is None:
+            # Roughly a tenth of users are Twitch subscribers
+            roles = [self.roles[user_id % 3]] if user_id % 10 == 0 else []
+            user = self.users[user_id] = FakeUser(user_id, f"user{user_id}", roles=roles)
+            self.guild.members[user_id] = user
+        return user
+
+    async def spawn_star(self, channel_id, word):
+        """Start a shooting star the way ShootingStarCog.start_shooting_star does, minus the image upload"""
+        cog = self.bot.get_cog('ShootingStarCog')
+        if not cog:
+            return
+        channel = self.channel(channel_id)
+        await cog.end_shooting_star(channel_id)
+        cog.activate_star(channel, word, await channel.send(content=f"shooting star: {word}"))
+
+    def simulate_rollover(self):
+        """Pretend the UTC date changed so every user can earn daily rewards again"""
+        self.db.enabled = False
+        conn = sqlite3.connect('not_object.db')
+        conn.execute("UPDATE daily_messages SET last_message_date = '1970-01-01'")
+        conn.execute("UPDATE daily_checkins SET last_checkin_date = '1970-01-01'")
+        conn.commit()
+        conn.close()
+        self.db.enabled = True
+
+    async def dispatch_message(self, event):
+        message = FakeMessage(self.channel(event['channel']), self.user(event['user']), event.get('content', ''))
+        listeners = [listener(message) for listener in self.bot.extra_events.get('on_message', [])]
+        await asyncio.gather(self.bot.on_message(message), *listeners)
+
+    async def dispatch_command(self, event):
+        command = self.bot.tree.get_command(event['name'])
+        if command is None:
+            return
+        interaction = FakeInteraction(self.user(event['user']), self.channel(event['channel']))
+        await command.callback(command.binding, interaction, **event.get('options', {}))
+
+    async def run_event(self, event):
+        kind = event['type']
+        if kind == 'star':
+            await self.spawn_star(event['channel'], event['word'])
+            return
+        if kind == 'rollover':
+            self.simulate_rollover()
+            return
+
+        started = time.perf_counter()
+        if kind == 'message':
+            await self.dispatch_message(event)
+        elif kind == 'command':
+            await self.dispatch_command(event)
+        else:
+            return
+        elapsed = time.perf_counter() - started
+
+        self.latencies.setdefault(kind, []).append(elapsed)
+        self.events += 1
+
+    async def pace(self, event, started, first_timestamp, speed):
+        """Sleep until the event's recorded offset (scaled by speed) has passed"""
+        if speed <= 0 or 't' not in event or first_timestamp is None:
+            return
+        delay = (event['t'] - first_timestamp) / speed - (time.perf_counter() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def run(self, events, concurrency=1, speed=0.0):
+        started = time.perf_counter()
+        first_timestamp = next((event['t'] for event in events if 't' in event), None)
+        if concurrency <= 1:
+            for event in events:
+                await self.pace(event, started, first_timestamp, speed)
+                await self.run_event(event)
+        else:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def bounded(event):
+                await self.pace(event, started, first_timestamp, speed)
+                async with semaphore:
+                    await self.run_event(event)
+
+            await asyncio.gather(*(bounded(event) for event in events))
+        return time.perf_counter() - started
+
+    async def drain(self):
+        """Wait for background work that outlives the events (e.g. batched message deletes)"""
+        cog = self.bot.get_cog('ShootingStarCog')
+        if cog and cog.deletion_tasks:
+            await asyncio.gather(*list(cog.deletion_tasks.values()), return_exceptions=True)
+
+    def report(self, wall_seconds):
+        all_latencies = sorted(itertools.chain.from_iterable(self.latencies.values()))
+        result = {
+            'events': self.events,
+            'wall_seconds': round(wall_seconds, 3),
+            'events_per_second': round(self.events / wall_seconds, 1) if wall_seconds else 0.0,
+            # Totals over the whole run: with concurrency, per-event before/after deltas would also count the
+            # DB calls of whatever else was running at the time
+            'db_connections': self.db.connections,
+            'db_statements': self.db.statements,
+            'db_connections_per_event': round(self.db.connections / self.events, 2) if self.events else 0.0,
+            'db_statements_per_event': round(self.db.statements / self.events, 2) if self.events else 0.0,
+            'latency_ms': latency_summary(all_latencies),
+            'latency_ms_by_type': {kind: latency_summary(sorted(values)) for kind, values in self.latencies.items()},
+            'discord_calls': {
+                'sends': sum(c.stats['sends'] for c in self.channels.values()),
+                'deletes': sum(c.stats['deletes'] for c in self.channels.values()),
+                'bulk_deletes': sum(c.stats['bulk_deletes'] for c in self.channels.values()),
+                'edits': sum(c.stats['edits'] for c in self.channels.values()),
+                'http_requests': len(self.http.requests),
+            },
+        }
+        return result
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def latency_summary(sorted_values):
+    return {
+        'p50': round(percentile(sorted_values, 50) * 1000, 3),
+        'p95': round(percentile(sorted_values, 95) * 1000, 3),
+        'p99': round(percentile(sorted_values, 99) * 1000, 3),
+        'max': round((sorted_values[-1] if sorted_values else 0.0) * 1000, 3),
+    }
+
+
+def print_report(result):
+    print(f"Events:              {result['events']}")
+    print(f"Wall time:           {result['wall_seconds']} s")
+    print(f"Throughput:          {result['events_per_second']} events/s")
+    print(f"DB connections/evt:  {result['db_connections_per_event']}")
+    print(f"DB statements/evt:   {result['db_statements_per_event']}")
+    latency = result['latency_ms']
+    print(f"Latency (ms):        p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    for kind, summary in result['latency_ms_by_type'].items():
+        print(f"  {kind:<18} p50 {summary['p50']}  p95 {summary['p95']}  p99 {summary['p99']}  max {summary['max']}")
+    calls = result['discord_calls']
+    print(f"Discord calls:       {calls['sends']} sends, {calls['deletes']} deletes, "
+          f"{calls['bulk_deletes']} bulk deletes, {calls['edits']} edits, {calls['http_requests']} stray HTTP requests")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay gateway events through NotObjectBot offline")
+    parser.add_argument('--trace', help="Replay events from a trace file or recorder directory instead of generating them")
+    parser.add_argument('--messages', type=int, default=50000, help="Number of synthetic messages")
+    parser.add_argument('--users', type=int, default=5000, help="Number of distinct synthetic users")
+    parser.add_argument('--channels', type=int, default=10, help="Number of synthetic channels")
+    parser.add_argument('--star-every', type=int, default=5000, help="Spawn a shooting star every N messages (0 to disable)")
+    parser.add_argument('--command-ratio', type=float, default=0.01, help="Fraction of events that are slash commands")
+    parser.add_argument('--rollover-at', type=float, default=0.5, help="Fraction of the stream at which the UTC day rolls over")
+    parser.add_argument('--concurrency', type=int, default=1, help="Events processed concurrently, like gateway dispatch")
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help="Replay recorded traces at this multiple of real time (0 replays as fast as possible)")
+    parser.add_argument('--seed', type=int, default=1234, help="Random seed for the synthetic stream")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    if args.trace:
+        events = load_trace_events(os.path.abspath(args.trace))
+    else:
+        events = generate_synthetic_events(args.messages, args.users, args.channels, args.star_every,
+                                           args.command_ratio, args.rollover_at, args.seed)
+
+    # Never talk to anything real: no tokens, no external services, a throwaway database
+    # (set to empty rather than removed so load_dotenv can't fill them back in)
+    for key in ('DISCORD_TOKEN', 'OPENAI_API_KEY', 'SPOTIFY_CLIENT_ID', 'SPOTIFY_CLIENT_SECRET'):
+        os.environ[key] = ''
+    os.environ.update({key: str(value) for key, value in TIER_ROLE_IDS.items()})
+    sys.path.insert(0, REPO_ROOT)
+
+    with tempfile.TemporaryDirectory(prefix='replay-') as workdir:
+        os.chdir(workdir)
+        import bot as module
+
+        harness = ReplayHarness(module.NotObjectBot(), module)
+        await harness.setup()
+        try:
+            wall_seconds = await harness.run(events, args.concurrency, args.speed)
+            await harness.drain()
+        finally:
+            harness.db.uninstall()
+            os.chdir(REPO_ROOT)
+
+    result = harness.report(wall_seconds)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+    return result
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+import datetime
+import os
+
+from utils.database import get_channel_activity, save_channel_activity
+
+
+class ActivityHistogram:
+    """Per-channel, per-hour message activity with exponential daily decay.
+
+    Messages are counted in memory (O(1) per message) and folded into the persisted weights
+    whenever the histogram is flushed: at day rollover, on shutdown and before a shooting star
+    schedule is generated. A stored weight is decayed by ACTIVITY_DECAY for every day since it
+    was last updated, so recent days dominate. Hours use the same local clock as the schedule.
+    """
+
+    def __init__(self, decay=None):
+        self.decay = decay if decay is not None else float(os.getenv('ACTIVITY_DECAY', '0.8'))
+        self.day = datetime.date.today()
+        self.counts = {}  # channel_id -> list of 24 message counts since the last flush
+
+    def record(self, channel_id, now=None):
+        """Count a message in a channel"""
+        now = now or datetime.datetime.now()
+        if now.date() != self.day:
+            # Counts belong to the day they were made, so fold them in before starting the new day
+            self.flush()
+            self.day = now.date()
+
+        counts = self.counts.get(channel_id)
+        if counts is None:
+            counts = self.counts[channel_id] = [0] * 24
+        counts[now.hour] += 1
+
+    def _decayed(self, weight, as_of, day):
+        days = (day - datetime.date.fromisoformat(as_of)).days
+        return weight * (self.decay ** days) if days > 0 else weight
+
+    def flush(self):
+        """Fold the in-memory counts into the persisted weights"""
+        if not self.counts:
+            return
+
+        day = self.day.isoformat()
+        stored = get_channel_activity(list(self.counts))
+        rows = []
+        for channel_id, counts in self.counts.items():
+            for hour, count in enumerate(counts):
+                if not count:
+                    continue
+                weight, as_of = stored.get((channel_id, hour), (0.0, day))
+                rows.append((channel_id, hour, self._decayed(weight, as_of, self.day) + count, day))
+
+        save_channel_activity(rows)
+        self.counts = {}
+
+    def get_weights(self, channel_ids):
+        """Get today's decayed activity weights as {channel_id: [24 weights]}, including unflushed counts"""
+        today = datetime.date.today()
+        weights = {channel_id: [0.0] * 24 for channel_id in channel_ids}
+
+        for (channel_id, hour), (weight, as_of) in get_channel_activity(channel_ids).items():
+            weights[channel_id][hour] = self._decayed(weight, as_of, today)
+
+        for channel_id in channel_ids:
+            counts = self.counts.get(channel_id)
+            if counts:
+                for hour, count in enumerate(counts):
+                    weights[channel_id][hour] += count
+
+        return weights
+
+
+def weighted_sample(items, weights, k, rng):
+    """Pick k distinct items with probability proportional to their weights (all weights must be > 0)"""
+    # Efraimidis-Spirakis: keep the k items with the largest random key u ** (1 / weight)
+    keyed = sorted(((rng.random() ** (1.0 / weight), item) for item, weight in zip(items, weights)),
+                   key=lambda pair: pair[0], reverse=True)
+    return [item for _, item in keyed[:k]]
@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import io
+import os
+import time
+from urllib.parse import urlparse, parse_qs
+
+import discord
+
+from utils.database import get_cached_asset, save_cached_asset
+
+
+# Re-upload signed CDN URLs this long before they expire
+EXPIRY_MARGIN_SECONDS = 3600
+
+
+def get_url_expiry(url):
+    """Get the expiry timestamp of a signed Discord CDN URL (its hex `ex` parameter), or None if it doesn't expire"""
+    expiry = parse_qs(urlparse(url).query).get('ex')
+    if not expiry:
+        return None
+    try:
+        return int(expiry[0], 16)
+    except ValueError:
+        return None
+
+
+class AssetCache:
+    """Upload static media once and reuse the resulting URL in embeds.
+
+    Each asset can have a configured URL (e.g. a CDN), which is always used as is. Otherwise the
+    file is uploaded once to the ASSET_CHANNEL_ID channel and the attachment URL is remembered in
+    memory and in the database until it is about to expire or the file changes. Messages in the
+    asset channel must not be deleted. Without an asset channel, the file is attached to each
+    message from an in-memory copy, so at least the disk isn't read every time.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.assets = {}  # name -> dict with path, filename, configured_url, url, expires_at, data, content_hash
+        self._upload_lock = asyncio.Lock()  # Concurrent stars shouldn't upload the same file twice
+
+    def register(self, name, path, url=None, filename=None):
+        """Register a static file under a name, optionally with a fixed URL to use instead of uploading"""
+        self.assets[name] = {
+            'path': path,
+            'filename': filename or os.path.basename(path),
+            'configured_url': url,
+            'url': None,
+            'expires_at': None,
+            'data': None,
+            'content_hash': None
+        }
+
+    def _load_data(self, asset):
+        """Read the asset's file into memory the first time it's needed"""
+        if asset['data'] is None:
+            with open(asset['path'], 'rb') as f:
+                asset['data'] = f.read()
+            asset['content_hash'] = hashlib.sha256(asset['data']).hexdigest()
+        return asset['data']
+
+    def _is_valid(self, url, expires_at):
+        return url is not None and (expires_at is None or expires_at - time.time() > EXPIRY_MARGIN_SECONDS)
+
+    async def get_url(self, name):
+        """Get a URL for the asset, uploading it if needed. Returns None if no URL is available"""
+        asset = self.assets[name]
+        if asset['configured_url']:
+            return asset['configured_url']
+
+        if self._is_valid(asset['url'], asset['expires_at']):
+            return asset['url']
+
+        if not os.getenv('ASSET_CHANNEL_ID'):
+            return None
+
+        async with self._upload_lock:
+            # Another caller may have uploaded it while we waited
+            if self._is_valid(asset['url'], asset['expires_at']):
+                return asset['url']
+
+            # Reuse the upload from a previous run if it's for the same file and still valid
+            self._load_data(asset)
+            cached = get_cached_asset(name)
+            if cached and cached['content_hash'] == asset['content_hash'] and self._is_valid(cached['url'], cached['expires_at']):
+                asset['url'], asset['expires_at'] = cached['url'], cached['expires_at']
+                return asset['url']
+
+            return await self._upload(name, asset)
+
+    async def _upload(self, name, asset):
+        """Upload the asset to the asset channel and remember its URL"""
+        asset_channel_id = os.getenv('ASSET_CHANNEL_ID')
+        if not asset_channel_id:
+            return None
+
+        channel = self.bot.get_channel(int(asset_channel_id))
+        if not channel:
+            print(f"Could not find asset channel with ID {asset_channel_id}")
+            return None
+
+        try:
+            message = await channel.send(file=discord.File(io.BytesIO(asset['data']), filename=asset['filename']))
+        except discord.HTTPException as e:
+            print(f"Error uploading asset {name}: {e}")
+            return None
+
+        url = message.attachments[0].url
+        asset['url'], asset['expires_at'] = url, get_url_expiry(url)
+        save_cached_asset(name, url, asset['content_hash'], asset['expires_at'])
+        print(f"Uploaded asset {name} to the asset channel")
+        return url
+
+    async def attach(self, embed, name):
+        """Set the asset as the embed's image. Returns a discord.File to send along, or None if a URL is used"""
+        url = await self.get_url(name)
+        if url:
+            embed.set_image(url=url)
+            return None
+
+        asset = self.assets[name]
+        embed.set_image(url=f"attachment://{asset['filename']}")
+        return discord.File(io.BytesIO(self._load_data(asset)), filename=asset['filename'])
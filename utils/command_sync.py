@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+
+import discord
+
+
+COMMAND_SYNC_STATE_FILE = 'command_sync_state.json'
+
+
+def _canonical(payload):
+    """Serialize a payload the same way every time so its hash is stable"""
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def _command_payloads(tree, guild):
+    """Get the payload Discord would receive for every command in a scope, keyed by type and name"""
+    payloads = {}
+    for command in tree.get_commands(guild=guild):
+        payload = command.to_dict(tree)
+        payloads[f"{payload.get('type', 1)}:{payload['name']}"] = payload
+    return payloads
+
+
+def fingerprint_commands(tree, guild=None):
+    """Return (fingerprint, per-command hashes) for the commands registered in a scope"""
+    command_hashes = {
+        key: hashlib.sha256(_canonical(payload).encode('utf-8')).hexdigest()
+        for key, payload in _command_payloads(tree, guild).items()
+    }
+    fingerprint = hashlib.sha256(_canonical(command_hashes).encode('utf-8')).hexdigest()
+    return fingerprint, command_hashes
+
+
+def diff_command_hashes(old, new):
+    """Compare two sets of per-command hashes. Returns (added, removed, changed) lists of command keys"""
+    added = sorted(key for key in new if key not in old)
+    removed = sorted(key for key in old if key not in new)
+    changed = sorted(key for key in new if key in old and old[key] != new[key])
+    return added, removed, changed
+
+
+def load_sync_state(path=COMMAND_SYNC_STATE_FILE):
+    """Load the last synced fingerprints from disk"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_sync_state(state, path=COMMAND_SYNC_STATE_FILE):
+    """Save synced fingerprints to disk, replacing the file atomically"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def get_sync_guild_ids():
+    """Get the guild IDs with guild-specific commands to sync, from COMMAND_SYNC_GUILD_IDS"""
+    guild_ids_str = os.getenv('COMMAND_SYNC_GUILD_IDS', '')
+    guild_ids = []
+    for gid in guild_ids_str.split(','):
+        gid = gid.strip()
+        if not gid:
+            continue
+        try:
+            guild_ids.append(int(gid))
+        except ValueError:
+            print(f"Ignoring invalid guild ID in COMMAND_SYNC_GUILD_IDS: {gid}")
+    return guild_ids
+
+
+async def sync_if_changed(tree, guild_ids=None, force=False, path=COMMAND_SYNC_STATE_FILE):
+    """Sync the command tree globally and for each guild, but only for scopes whose fingerprint changed.
+
+    Returns the list of scopes that were synced ('global' or the guild ID as a string).
+    """
+    if guild_ids is None:
+        guild_ids = get_sync_guild_ids()
+
+    state = load_sync_state(path)
+    scopes = [('global', None)] + [(str(gid), discord.Object(id=gid)) for gid in guild_ids]
+    synced = []
+
+    for scope, guild in scopes:
+        fingerprint, command_hashes = fingerprint_commands(tree, guild)
+        previous = state.get(scope, {})
+
+        if not force and previous.get('fingerprint') == fingerprint:
+            print(f"Commands unchanged for {scope} scope ({fingerprint[:12]}), skipping sync")
+            continue
+
+        added, removed, changed = diff_command_hashes(previous.get('commands', {}), command_hashes)
+        print(f"Syncing commands for {scope} scope ({previous.get('fingerprint', 'none')[:12]} -> {fingerprint[:12]})")
+        for label, keys in (('added', added), ('removed', removed), ('changed', changed)):
+            if keys:
+                print(f"  {label}: {', '.join(key.split(':', 1)[1] for key in keys)}")
+
+        try:
+            await tree.sync(guild=guild)
+        except discord.HTTPException as e:
+            print(f"Error syncing commands for {scope} scope: {e}")
+            continue
+
+        state[scope] = {'fingerprint': fingerprint, 'commands': command_hashes}
+        save_sync_state(state, path)
+        synced.append(scope)
+
+    return synced
@@ -0,0 +1,103 @@
+from collections import OrderedDict, deque
+
+
+def estimate_tokens(text):
+    """Roughly estimate how many tokens a piece of text is (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+class Conversation:
+    """One user's recent /ask exchanges, plus a summary of the ones before them.
+
+    The most recent turns are kept word for word in a ring buffer. Turns that fall out of it, or
+    that no longer fit in the token budget, wait in pending until they're folded into the summary.
+    """
+
+    def __init__(self, max_turns):
+        self.max_turns = max_turns
+        self.turns = deque()  # (question, answer), oldest first
+        self.pending = []  # turns waiting to be summarized, oldest first
+        self.summary = ""
+        self.summarizing = False
+
+    def add_turn(self, question, answer):
+        """Remember an exchange, pushing the oldest one out to be summarized if the buffer is full"""
+        self.turns.append((question, answer))
+        while len(self.turns) > self.max_turns:
+            self.pending.append(self.turns.popleft())
+
+    def build_messages(self, system_prompt, question, token_budget):
+        """Build the chat messages for a new question, keeping the summary, turns and question within token_budget.
+
+        Turns are kept newest first until the budget runs out; older ones are moved to pending.
+        """
+        used = estimate_tokens(question)
+        if self.summary:
+            used += estimate_tokens(self.summary)
+
+        kept = 0
+        for asked, answered in reversed(self.turns):
+            cost = estimate_tokens(asked) + estimate_tokens(answered)
+            if used + cost > token_budget:
+                break
+            used += cost
+            kept += 1
+        while len(self.turns) > kept:
+            self.pending.append(self.turns.popleft())
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of your earlier conversation with this user: {self.summary}"})
+        for asked, answered in self.turns:
+            messages.append({"role": "user", "content": asked})
+            messages.append({"role": "assistant", "content": answered})
+        messages.append({"role": "user", "content": question})
+        return messages
+
+    def take_pending(self):
+        """Get (prompt, count) for summarizing the pending turns, or (None, 0) if there are none.
+
+        Pass the summary and count to finish_summary. If summarizing keeps failing, only the newest
+        max_turns pending turns are kept.
+        """
+        del self.pending[:-self.max_turns]
+        if not self.pending:
+            return None, 0
+
+        lines = []
+        if self.summary:
+            lines.append(f"Summary so far: {self.summary}")
+        for asked, answered in self.pending:
+            lines.append(f"User: {asked}")
+            lines.append(f"Assistant: {answered}")
+        return "\n".join(lines), len(self.pending)
+
+    def finish_summary(self, summary, count):
+        """Replace the summary once the first count pending turns have been folded into it"""
+        self.summary = summary.strip()
+        del self.pending[:count]
+
+
+class ConversationMemory:
+    """Conversations for the users who've opted in to /ask memory, evicting the least recently used past max_users"""
+
+    def __init__(self, max_users, max_turns, token_budget):
+        self.max_users = max_users
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.conversations = OrderedDict()  # user ID -> Conversation, least recently used first
+
+    def get(self, user_id):
+        """Get a user's conversation, starting a new one if they don't have one"""
+        conversation = self.conversations.get(user_id)
+        if conversation is None:
+            conversation = self.conversations[user_id] = Conversation(self.max_turns)
+            while len(self.conversations) > self.max_users:
+                self.conversations.popitem(last=False)
+        else:
+            self.conversations.move_to_end(user_id)
+        return conversation
+
+    def forget(self, user_id):
+        """Drop a user's conversation. Returns whether there was one"""
+        return self.conversations.pop(user_id, None) is not None
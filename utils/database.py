@@ -1,4 +1,5 @@
 import sqlite3
+import time
 
 
 def init_database():
@@ -68,6 +69,146 @@ def init_database():
             FOREIGN KEY (user_id) REFERENCES users (user_id)
         )
     ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS shooting_star_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            channel_id INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            completed INTEGER DEFAULT 0,
+            started_at TEXT,
+            caught_by INTEGER,
+            caught_at TEXT,
+            catch_latency_ms INTEGER
+        )
+    ''')
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_shooting_star_events_date_time
+        ON shooting_star_events (date, time, channel_id)
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS shooting_star_catches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER,
+            user_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            word TEXT NOT NULL,
+            latency_ms INTEGER NOT NULL,
+            caught_at TEXT NOT NULL,
+            FOREIGN KEY (event_id) REFERENCES shooting_star_events (id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_shooting_star_catches_latency ON shooting_star_catches (latency_ms)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_shooting_star_catches_user ON shooting_star_catches (user_id, latency_ms)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS shooting_star_user_stats (
+            user_id INTEGER PRIMARY KEY,
+            catches INTEGER NOT NULL DEFAULT 0,
+            total_latency_ms INTEGER NOT NULL DEFAULT 0,
+            best_latency_ms INTEGER,
+            last_caught_at TEXT
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_shooting_star_user_stats_catches ON shooting_star_user_stats (catches)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS shooting_star_latency_buckets (
+            user_id INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, bucket)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS channel_activity (
+            channel_id INTEGER NOT NULL,
+            hour INTEGER NOT NULL,
+            weight REAL NOT NULL DEFAULT 0,
+            as_of_date TEXT NOT NULL,
+            PRIMARY KEY (channel_id, hour)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS photos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT NOT NULL UNIQUE,
+            width INTEGER,
+            height INTEGER,
+            taken_at TEXT,
+            latitude REAL,
+            longitude REAL,
+            city TEXT,
+            country TEXT,
+            location_resolved INTEGER DEFAULT 0,
+            revealed INTEGER DEFAULT 0,
+            revealed_at TIMESTAMP,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            derivative TEXT,
+            queue_key INTEGER,
+            phash INTEGER,
+            duplicate_of INTEGER,
+            content_hash TEXT
+        )
+    ''')
+    # Photo counters, kept in step with the photos table by the triggers below so they change in the same transaction
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS photo_counters (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total INTEGER NOT NULL DEFAULT 0,
+            revealed INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    # Unrevealed photos are revealed in queue_key order, which is random, so the reveal queue is a pre-shuffled index scan.
+    # New photos get a queue_key only once ingest has checked them for duplicates (see enqueue_ready_photos).
+    # Duplicates never enter the queue
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_photos_reveal_queue ON photos (queue_key) WHERE revealed = 0 AND duplicate_of IS NULL AND queue_key IS NOT NULL')
+    # Counters only include photos that aren't duplicates
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS photos_count_insert AFTER INSERT ON photos WHEN NEW.duplicate_of IS NULL BEGIN
+            UPDATE photo_counters SET total = total + 1, revealed = revealed + NEW.revealed WHERE id = 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS photos_count_delete AFTER DELETE ON photos WHEN OLD.duplicate_of IS NULL BEGIN
+            UPDATE photo_counters SET total = total - 1, revealed = revealed - OLD.revealed WHERE id = 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS photos_count_update AFTER UPDATE OF revealed, duplicate_of ON photos BEGIN
+            UPDATE photo_counters SET
+                total = total + (NEW.duplicate_of IS NULL) - (OLD.duplicate_of IS NULL),
+                revealed = revealed + NEW.revealed * (NEW.duplicate_of IS NULL) - OLD.revealed * (OLD.duplicate_of IS NULL)
+            WHERE id = 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            lat_key INTEGER NOT NULL,
+            lon_key INTEGER NOT NULL,
+            precision INTEGER NOT NULL,
+            city TEXT,
+            country TEXT,
+            resolved_at INTEGER NOT NULL,
+            PRIMARY KEY (lat_key, lon_key, precision)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS llm_response_cache (
+            cache_key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
+            last_used INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_response_cache_last_used ON llm_response_cache (last_used)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS asset_cache (
+            name TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            expires_at INTEGER
+        )
+    ''')
     
     # Add lifetime_coins column if it doesn't exist (for existing databases)
     try:
@@ -76,6 +217,12 @@ def init_database():
         # Column already exists, ignore
         pass
     
+    # Recount photos in case the counters are missing or were changed by hand
+    cursor.execute('''
+        INSERT OR REPLACE INTO photo_counters (id, total, revealed)
+        SELECT 1, COUNT(*), COALESCE(SUM(revealed), 0) FROM photos WHERE duplicate_of IS NULL
+    ''')
+    
     # Update existing users to have lifetime_coins equal to their current coins
     cursor.execute('UPDATE users SET lifetime_coins = coins WHERE lifetime_coins = 0 OR lifetime_coins IS NULL')
     
@@ -584,3 +731,554 @@ def remove_user_birthday(user_id):
     
     conn.commit()
     conn.close()
+
+
+def get_cached_asset(name):
+    """Get the uploaded URL of a cached static asset. Returns None if it was never uploaded."""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT url, content_hash, expires_at FROM asset_cache WHERE name = ?', (name,))
+    result = cursor.fetchone()
+    conn.close()
+    
+    if result:
+        return {
+            'url': result[0],
+            'content_hash': result[1],
+            'expires_at': result[2]
+        }
+    return None
+
+
+def save_cached_asset(name, url, content_hash, expires_at):
+    """Save the uploaded URL of a static asset"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        INSERT OR REPLACE INTO asset_cache (name, url, content_hash, expires_at)
+        VALUES (?, ?, ?, ?)
+    ''', (name, url, content_hash, expires_at))
+    
+    conn.commit()
+    conn.close()
+
+
+def get_shooting_star_schedule(date):
+    """Get a day's shooting star events in time order. Returns an empty list if none were scheduled."""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT id, time, channel_id, message, completed
+        FROM shooting_star_events
+        WHERE date = ?
+        ORDER BY time, id
+    ''', (date,))
+    results = cursor.fetchall()
+    conn.close()
+    
+    return [
+        {
+            'id': result[0],
+            'time': result[1],
+            'channel_id': result[2],
+            'message': result[3],
+            'completed': bool(result[4])
+        }
+        for result in results
+    ]
+
+
+def save_shooting_star_schedule(date, events):
+    """Save a day's shooting star events in a single transaction and set each event's 'id'"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    try:
+        for event in events:
+            cursor.execute('''
+                INSERT OR IGNORE INTO shooting_star_events (date, time, channel_id, message, completed)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (date, event['time'], event['channel_id'], event['message'], int(event.get('completed', False))))
+            cursor.execute('SELECT id FROM shooting_star_events WHERE date = ? AND time = ? AND channel_id = ?',
+                           (date, event['time'], event['channel_id']))
+            event['id'] = cursor.fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def mark_shooting_star_event_completed(event_id, started=True):
+    """Mark a shooting star event as completed so it isn't run again. Skipped events get no started_at"""
+    from datetime import datetime, timezone
+    
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        UPDATE shooting_star_events
+        SET completed = 1, started_at = ?
+        WHERE id = ?
+    ''', (datetime.now(timezone.utc).isoformat() if started else None, event_id))
+    
+    conn.commit()
+    conn.close()
+
+
+# Catch latencies are counted in buckets: 100 ms wide up to 10 seconds, then 1 second wide.
+# Bucket rows with user_id ALL_CATCHERS hold the totals for everyone.
+ALL_CATCHERS = 0
+
+
+def catch_latency_bucket(latency_ms):
+    """Get the histogram bucket for a catch latency"""
+    if latency_ms < 10000:
+        return latency_ms // 100
+    return 100 + (latency_ms - 10000) // 1000
+
+
+def catch_latency_bucket_upper_ms(bucket):
+    """Get the upper bound (exclusive) of a histogram bucket in milliseconds"""
+    if bucket < 100:
+        return (bucket + 1) * 100
+    return 10000 + (bucket - 99) * 1000
+
+
+def record_shooting_star_catch(event_id, user_id, channel_id, word, catch_latency_ms):
+    """Record a shooting star catch and update the catch statistics in a single transaction"""
+    from datetime import datetime, timezone
+    
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    caught_at = datetime.now(timezone.utc).isoformat()
+    bucket = catch_latency_bucket(catch_latency_ms)
+    try:
+        if event_id:
+            cursor.execute('''
+                UPDATE shooting_star_events
+                SET caught_by = ?, caught_at = ?, catch_latency_ms = ?
+                WHERE id = ? AND caught_by IS NULL
+            ''', (user_id, caught_at, catch_latency_ms, event_id))
+        cursor.execute('''
+            INSERT INTO shooting_star_catches (event_id, user_id, channel_id, word, latency_ms, caught_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (event_id, user_id, channel_id, word, catch_latency_ms, caught_at))
+        cursor.execute('''
+            INSERT INTO shooting_star_user_stats (user_id, catches, total_latency_ms, best_latency_ms, last_caught_at)
+            VALUES (?, 1, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                catches = catches + 1,
+                total_latency_ms = total_latency_ms + excluded.total_latency_ms,
+                best_latency_ms = MIN(best_latency_ms, excluded.best_latency_ms),
+                last_caught_at = excluded.last_caught_at
+        ''', (user_id, catch_latency_ms, catch_latency_ms, caught_at))
+        cursor.executemany('''
+            INSERT INTO shooting_star_latency_buckets (user_id, bucket, count)
+            VALUES (?, ?, 1)
+            ON CONFLICT (user_id, bucket) DO UPDATE SET count = count + 1
+        ''', [(user_id, bucket), (ALL_CATCHERS, bucket)])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def get_fastest_catches(limit=5):
+    """Get the fastest shooting star catches: (user_id, latency_ms, word, caught_at)"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT user_id, latency_ms, word, caught_at
+        FROM shooting_star_catches
+        ORDER BY latency_ms
+        LIMIT ?
+    ''', (limit,))
+    results = cursor.fetchall()
+    conn.close()
+    
+    return results
+
+
+def get_top_star_catchers(limit=5):
+    """Get the users with the most catches: (user_id, catches, average latency ms, best latency ms)"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT user_id, catches, total_latency_ms / catches, best_latency_ms
+        FROM shooting_star_user_stats
+        ORDER BY catches DESC
+        LIMIT ?
+    ''', (limit,))
+    results = cursor.fetchall()
+    conn.close()
+    
+    return results
+
+
+def get_user_star_stats(user_id):
+    """Get a user's catch statistics. Returns None if they never caught a star."""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT catches, total_latency_ms, best_latency_ms, last_caught_at
+        FROM shooting_star_user_stats
+        WHERE user_id = ?
+    ''', (user_id,))
+    result = cursor.fetchone()
+    conn.close()
+    
+    if result:
+        return {
+            'catches': result[0],
+            'average_latency_ms': result[1] // result[0],
+            'best_latency_ms': result[2],
+            'last_caught_at': result[3]
+        }
+    return None
+
+
+def get_catch_latency_histogram(user_id=ALL_CATCHERS):
+    """Get the catch latency histogram for a user (or everyone) as a list of (bucket, count) in bucket order"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT bucket, count
+        FROM shooting_star_latency_buckets
+        WHERE user_id = ?
+        ORDER BY bucket
+    ''', (user_id,))
+    results = cursor.fetchall()
+    conn.close()
+    
+    return results
+
+
+def get_shooting_star_history(days=30):
+    """Get per-day shooting star totals for the most recent days: (date, events, started, caught)"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT date, COUNT(*), COUNT(started_at), COUNT(caught_by)
+        FROM shooting_star_events
+        GROUP BY date
+        ORDER BY date DESC
+        LIMIT ?
+    ''', (days,))
+    results = cursor.fetchall()
+    conn.close()
+    
+    return results
+
+
+def get_channel_activity(channel_ids):
+    """Get stored activity weights for channels as {(channel_id, hour): (weight, as_of_date)}"""
+    if not channel_ids:
+        return {}
+    
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    placeholders = ', '.join('?' for _ in channel_ids)
+    cursor.execute(f'''
+        SELECT channel_id, hour, weight, as_of_date
+        FROM channel_activity
+        WHERE channel_id IN ({placeholders})
+    ''', list(channel_ids))
+    results = cursor.fetchall()
+    conn.close()
+    
+    return {(result[0], result[1]): (result[2], result[3]) for result in results}
+
+
+def save_channel_activity(rows):
+    """Save activity weights given as (channel_id, hour, weight, as_of_date) rows in a single transaction"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.executemany('''
+        INSERT OR REPLACE INTO channel_activity (channel_id, hour, weight, as_of_date)
+        VALUES (?, ?, ?, ?)
+    ''', rows)
+    
+    conn.commit()
+    conn.close()
+
+
+def get_indexed_photos():
+    """Get {filename: (revealed, location_resolved)} for every photo in the index"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT filename, revealed, location_resolved FROM photos')
+    results = cursor.fetchall()
+    conn.close()
+    
+    return {result[0]: (bool(result[1]), bool(result[2])) for result in results}
+
+
+def save_photos(photos):
+    """Insert or update photo metadata rows in a single transaction.
+    
+    New rows aren't in the reveal queue yet; enqueue_ready_photos adds them once they're ready.
+    An existing row (e.g. indexed by the bot while the import tool was copying the same file) keeps
+    its revealed flag and any location it already has; only missing location columns are filled in.
+    """
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.executemany('''
+        INSERT INTO photos (filename, width, height, taken_at, latitude, longitude, city, country, location_resolved, revealed, content_hash)
+        VALUES (:filename, :width, :height, :taken_at, :latitude, :longitude, :city, :country, :location_resolved, :revealed, :content_hash)
+        ON CONFLICT(filename) DO UPDATE SET
+            content_hash = COALESCE(excluded.content_hash, photos.content_hash),
+            width = excluded.width,
+            height = excluded.height,
+            taken_at = excluded.taken_at,
+            latitude = COALESCE(photos.latitude, excluded.latitude),
+            longitude = COALESCE(photos.longitude, excluded.longitude),
+            city = COALESCE(photos.city, excluded.city),
+            country = COALESCE(photos.country, excluded.country),
+            location_resolved = CASE
+                WHEN photos.latitude IS NULL AND excluded.latitude IS NOT NULL THEN excluded.location_resolved
+                ELSE MAX(photos.location_resolved, excluded.location_resolved)
+            END,
+            revealed = MAX(photos.revealed, excluded.revealed)
+    ''', photos)
+    
+    conn.commit()
+    conn.close()
+
+
+def get_photo_content_hashes():
+    """Get the content hashes of all photos that were imported with one"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT content_hash FROM photos WHERE content_hash IS NOT NULL')
+    results = cursor.fetchall()
+    conn.close()
+    
+    return {result[0] for result in results}
+
+
+def get_unresolved_photo_locations():
+    """Get (id, latitude, longitude) for photos with coordinates but no resolved location yet"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT id, latitude, longitude FROM photos
+        WHERE location_resolved = 0 AND latitude IS NOT NULL AND longitude IS NOT NULL
+    ''')
+    results = cursor.fetchall()
+    conn.close()
+    
+    return results
+
+
+def set_photo_location(photo_id, city, country):
+    """Store the resolved location of a photo"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        UPDATE photos SET city = ?, country = ?, location_resolved = 1 WHERE id = ?
+    ''', (city, country, photo_id))
+    
+    conn.commit()
+    conn.close()
+
+
+def get_photos_without_derivative():
+    """Get (id, filename) for unrevealed photos that don't have a derivative yet (GIFs are sent as is to keep animations)"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT id, filename FROM photos
+        WHERE revealed = 0 AND duplicate_of IS NULL AND derivative IS NULL AND lower(filename) NOT LIKE '%.gif'
+    ''')
+    results = cursor.fetchall()
+    conn.close()
+    
+    return results
+
+
+def set_photo_derivatives(rows):
+    """Store derivative file names given as (derivative, photo_id) rows in a single transaction"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.executemany('UPDATE photos SET derivative = ? WHERE id = ?', rows)
+    
+    conn.commit()
+    conn.close()
+
+
+def get_photo_hashes():
+    """Get (id, filename, revealed, phash, duplicate_of) for every photo, oldest first. phash is None if it isn't computed yet"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT id, filename, revealed, phash, duplicate_of FROM photos ORDER BY id')
+    results = cursor.fetchall()
+    conn.close()
+    
+    return results
+
+
+def set_photo_hashes(rows):
+    """Store perceptual hashes and duplicate links given as (phash, duplicate_of, photo_id) rows in a single transaction"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.executemany('UPDATE photos SET phash = ?, duplicate_of = ? WHERE id = ?', rows)
+    
+    conn.commit()
+    conn.close()
+
+
+def enqueue_ready_photos():
+    """Give unrevealed photos that have been checked for duplicates and have a derivative (GIFs don't need one)
+    a random place in the reveal queue. Returns how many were added"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        UPDATE photos SET queue_key = random()
+        WHERE queue_key IS NULL AND revealed = 0 AND duplicate_of IS NULL AND phash IS NOT NULL
+            AND (derivative IS NOT NULL OR lower(filename) LIKE '%.gif')
+    ''')
+    added = cursor.rowcount
+    
+    conn.commit()
+    conn.close()
+    
+    return added
+
+
+def delete_photos(filenames):
+    """Remove photos from the index"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.executemany('DELETE FROM photos WHERE filename = ?', [(filename,) for filename in filenames])
+    
+    conn.commit()
+    conn.close()
+
+
+def claim_random_photo():
+    """Atomically reveal the next photo in the shuffled queue.
+    
+    Returns the photo as a dict, with the total and revealed counts right after the claim, or None if none are left.
+    """
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        UPDATE photos SET revealed = 1, revealed_at = CURRENT_TIMESTAMP
+        WHERE id = (SELECT id FROM photos WHERE revealed = 0 AND duplicate_of IS NULL AND queue_key IS NOT NULL ORDER BY queue_key LIMIT 1)
+        RETURNING id, filename, city, country, taken_at, derivative
+    ''')
+    result = cursor.fetchone()
+    
+    # Read the counters inside the same transaction so they include this claim
+    cursor.execute('SELECT total, revealed FROM photo_counters WHERE id = 1')
+    counters = cursor.fetchone()
+    
+    conn.commit()
+    conn.close()
+    
+    if result:
+        return {
+            'id': result[0],
+            'filename': result[1],
+            'city': result[2],
+            'country': result[3],
+            'taken_at': result[4],
+            'derivative': result[5],
+            'total_photos': counters[0],
+            'revealed_photos': counters[1]
+        }
+    return None
+
+
+def get_cached_geocode(lat_key, lon_key, precision):
+    """Get a cached reverse geocoding result as (city, country, resolved_at). Returns None if it isn't cached."""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT city, country, resolved_at FROM geocode_cache
+        WHERE lat_key = ? AND lon_key = ? AND precision = ?
+    ''', (lat_key, lon_key, precision))
+    result = cursor.fetchone()
+    conn.close()
+    
+    return result
+
+
+def save_cached_geocode(lat_key, lon_key, precision, city, country, resolved_at):
+    """Save a reverse geocoding result (city and country are None for a failed lookup)"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        INSERT OR REPLACE INTO geocode_cache (lat_key, lon_key, precision, city, country, resolved_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (lat_key, lon_key, precision, city, country, resolved_at))
+    
+    conn.commit()
+    conn.close()
+
+
+def get_cached_llm_response(cache_key, min_created_at):
+    """Get a cached LLM response created after min_created_at, marking it as used. Returns None if there isn't one."""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        UPDATE llm_response_cache SET last_used = ?
+        WHERE cache_key = ? AND created_at >= ?
+        RETURNING response, created_at
+    ''', (int(time.time()), cache_key, min_created_at))
+    result = cursor.fetchone()
+    
+    conn.commit()
+    conn.close()
+    
+    return result
+
+
+def save_cached_llm_response(cache_key, response, created_at, max_entries, min_created_at):
+    """Save an LLM response, dropping expired entries and the least recently used ones beyond max_entries"""
+    conn = sqlite3.connect('not_object.db')
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        INSERT OR REPLACE INTO llm_response_cache (cache_key, response, created_at, last_used)
+        VALUES (?, ?, ?, ?)
+    ''', (cache_key, response, created_at, created_at))
+    cursor.execute('DELETE FROM llm_response_cache WHERE created_at < ?', (min_created_at,))
+    cursor.execute('''
+        DELETE FROM llm_response_cache WHERE cache_key IN (
+            SELECT cache_key FROM llm_response_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+        )
+    ''', (max_entries,))
+    
+    conn.commit()
+    conn.close()
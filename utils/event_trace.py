@@ -0,0 +1,122 @@
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import secrets
+import time
+
+
+TRACE_FILE_NAME = 'events.jsonl'
+
+
+class EventTraceRecorder:
+    """Write a compact, anonymized trace of gateway events to rotating JSON lines files.
+
+    Each line has the event type (e), a unix timestamp (t) and, where relevant, hashed user (u)
+    and channel (c) IDs, the content length (n), whether the content matched an active shooting
+    star word (s), a command name (x) and a star word (w). Message content itself is never written.
+    Writes go through a background thread so the event loop never blocks on disk I/O.
+    """
+
+    def __init__(self, directory, salt=None, max_bytes=10 * 1024 * 1024, backup_count=20):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.salt = salt or secrets.token_hex(16)
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(directory, TRACE_FILE_NAME),
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(logging.Formatter('%(message)s'))
+
+        self._queue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(self._queue, file_handler)
+        self._listener.start()
+
+        self._logger = logging.getLogger(f'event_trace.{id(self)}')
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        self._logger.addHandler(logging.handlers.QueueHandler(self._queue))
+
+    @classmethod
+    def from_env(cls):
+        """Create a recorder if EVENT_TRACE_DIR is set, otherwise return None"""
+        directory = os.getenv('EVENT_TRACE_DIR')
+        if not directory:
+            return None
+
+        max_mb = os.getenv('EVENT_TRACE_MAX_MB')
+        backups = os.getenv('EVENT_TRACE_BACKUPS')
+        recorder = cls(
+            directory,
+            salt=os.getenv('EVENT_TRACE_SALT'),
+            max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else 10 * 1024 * 1024,
+            backup_count=int(backups) if backups else 20
+        )
+        print(f"Recording anonymized event trace to {directory}")
+        return recorder
+
+    def hash_id(self, value):
+        """Hash a Discord ID with the recorder's salt so traces can't be linked back to users"""
+        return hashlib.blake2b(f"{self.salt}:{value}".encode('utf-8'), digest_size=8).hexdigest()
+
+    def record(self, event_type, user_id=None, channel_id=None, content=None, star_match=None, name=None, word=None):
+        """Record a single event"""
+        entry = {'e': event_type, 't': round(time.time(), 3)}
+        if user_id is not None:
+            entry['u'] = self.hash_id(user_id)
+        if channel_id is not None:
+            entry['c'] = self.hash_id(channel_id)
+        if content is not None:
+            entry['n'] = len(content)
+        if star_match:
+            entry['s'] = 1
+        if name is not None:
+            entry['x'] = name
+        if word is not None:
+            entry['w'] = word
+        self._logger.info(json.dumps(entry, separators=(',', ':')))
+
+    def close(self):
+        """Flush pending events, stop the writer thread and close the trace file"""
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+
+
+def trace_files(path):
+    """List trace files for a path, oldest first. Accepts a single file or a trace directory"""
+    if os.path.isfile(path):
+        return [path]
+
+    base = os.path.join(path, TRACE_FILE_NAME)
+    rotated = []
+    for file_name in os.listdir(path):
+        suffix = file_name[len(TRACE_FILE_NAME) + 1:]
+        if file_name.startswith(TRACE_FILE_NAME + '.') and suffix.isdigit():
+            rotated.append((int(suffix), os.path.join(path, file_name)))
+
+    # Rotated files are numbered newest (.1) to oldest (.N)
+    files = [file_path for _, file_path in sorted(rotated, reverse=True)]
+    if os.path.exists(base):
+        files.append(base)
+    return files
+
+
+def read_trace(path):
+    """Yield trace entries from a trace file or directory in recording order"""
+    for file_path in trace_files(path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a partial last line
+                    continue
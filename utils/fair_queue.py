@@ -0,0 +1,95 @@
+import asyncio
+from collections import OrderedDict, deque
+
+
+class QueueFull(Exception):
+    """Raised when a FairQueue already has as many requests waiting as it allows"""
+
+
+class FairQueue:
+    """Caps how many requests run at once and queues the rest fairly between users.
+
+    Waiting requests are kept per user and free slots are handed out round-robin, one request per
+    user at a time, so one user sending a flood of requests only delays their own. The number of
+    waiting requests is bounded; past that, enter() raises QueueFull instead of queueing.
+
+    Usage:
+        ticket = queue.enter(user_id)
+        try:
+            await ticket
+            ...
+        finally:
+            queue.leave(user_id, ticket)
+    """
+
+    def __init__(self, max_concurrent, max_waiting):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.active = 0
+        self.waiting = OrderedDict()  # user ID -> deque of tickets, in round-robin order
+        self.waiting_count = 0
+
+    def is_full(self):
+        """Check whether enter() would raise QueueFull right now"""
+        return self.active >= self.max_concurrent and self.waiting_count >= self.max_waiting
+
+    def enter(self, user_id):
+        """Get a ticket (a future) that's done once the request may run. Raises QueueFull"""
+        ticket = asyncio.get_running_loop().create_future()
+        if self.active < self.max_concurrent and not self.waiting_count:
+            self.active += 1
+            ticket.set_result(None)
+            return ticket
+
+        if self.waiting_count >= self.max_waiting:
+            raise QueueFull(f"{self.waiting_count} requests are already waiting")
+        self.waiting.setdefault(user_id, deque()).append(ticket)
+        self.waiting_count += 1
+        return ticket
+
+    def leave(self, user_id, ticket):
+        """Give up a ticket: free its slot if it was running, or take it out of the queue"""
+        if ticket.done() and not ticket.cancelled():
+            self.active -= 1
+            self._wake()
+            return
+
+        ticket.cancel()
+        tickets = self.waiting.get(user_id)
+        if tickets and ticket in tickets:
+            tickets.remove(ticket)
+            self.waiting_count -= 1
+            if not tickets:
+                del self.waiting[user_id]
+
+    def position(self, user_id, ticket):
+        """Get a waiting ticket's 1-based place in line, or 0 if it isn't waiting"""
+        tickets = self.waiting.get(user_id)
+        if not tickets or ticket not in tickets:
+            return 0
+
+        # Each round serves one request from every user, starting with the user at the front
+        index = tickets.index(ticket)
+        position = index + 1
+        ahead = True
+        for other_id, other_tickets in self.waiting.items():
+            if other_id == user_id:
+                ahead = False
+                continue
+            position += min(len(other_tickets), index + 1 if ahead else index)
+        return position
+
+    def _wake(self):
+        """Hand free slots to waiting users, round-robin"""
+        while self.active < self.max_concurrent and self.waiting:
+            user_id, tickets = next(iter(self.waiting.items()))
+            ticket = tickets.popleft()
+            self.waiting_count -= 1
+            if tickets:
+                self.waiting.move_to_end(user_id)
+            else:
+                del self.waiting[user_id]
+
+            if not ticket.done():
+                self.active += 1
+                ticket.set_result(None)
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.database import get_cached_geocode, save_cached_geocode
+from utils.photo_metadata import format_coordinates, resolve_location
+
+
+class GeocodeCache:
+    """Two-tier cache for reverse geocoding results: an in-memory LRU in front of the geocode_cache table.
+
+    Coordinates are quantized to GEOCODE_CACHE_PRECISION decimal places (default 3, about 100 m),
+    so photos taken around the same spot share one lookup. Only real city/country results are shared:
+    a failed lookup, or one that fell back to the photo's own coordinates, is cached as a failure for
+    GEOCODE_NEGATIVE_TTL_HOURS (default 24) so it's retried later.
+    """
+
+    def __init__(self, precision=None, max_entries=None, negative_ttl=None, resolver=resolve_location):
+        self.precision = precision if precision is not None else int(os.getenv('GEOCODE_CACHE_PRECISION', '3'))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('GEOCODE_CACHE_SIZE', '1024'))
+        self.negative_ttl = negative_ttl if negative_ttl is not None else float(os.getenv('GEOCODE_NEGATIVE_TTL_HOURS', '24')) * 3600
+        self.resolver = resolver
+        self.entries = OrderedDict()  # (lat_key, lon_key) -> (city, country, resolved_at)
+        self.lock = threading.Lock()  # Ingest runs in a worker thread
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'negative_hits': 0}
+
+    def _key(self, lat, lon):
+        scale = 10 ** self.precision
+        return round(lat * scale), round(lon * scale)
+
+    def _is_fresh(self, entry):
+        city, country, resolved_at = entry
+        return city is not None or time.time() - resolved_at < self.negative_ttl
+
+    def _is_place(self, lat, lon, city, country):
+        """Check whether a resolver result is a real place rather than a failure or a coordinate fallback"""
+        return bool(city and country) and city != format_coordinates(lat, lon)[0]
+
+    def _remember(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def _count(self, stat, entry):
+        with self.lock:
+            self.stats[stat] += 1
+            if entry[0] is None:
+                self.stats['negative_hits'] += 1
+
+    def resolve(self, lat, lon):
+        """Get (city, country) for coordinates, using the cache when possible.
+
+        Returns (None, None) while a failure for the cell is cached. A fresh lookup's coordinate fallback
+        is returned as is, since it's only right for these coordinates.
+        """
+        key = self._key(lat, lon)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        if entry is not None and self._is_fresh(entry):
+            self._count('memory_hits', entry)
+            return entry[0], entry[1]
+
+        entry = get_cached_geocode(key[0], key[1], self.precision)
+        if entry is not None and self._is_fresh(entry):
+            self._remember(key, entry)
+            self._count('db_hits', entry)
+            return entry[0], entry[1]
+
+        with self.lock:
+            self.stats['misses'] += 1
+        city, country = self.resolver(lat, lon)
+        if self._is_place(lat, lon, city, country):
+            entry = (city, country, int(time.time()))
+        else:
+            entry = (None, None, int(time.time()))
+        save_cached_geocode(key[0], key[1], self.precision, entry[0], entry[1], entry[2])
+        self._remember(key, entry)
+        return city, country
+
+    def get_stats(self):
+        """Get hit/miss counters and the hit rate"""
+        with self.lock:
+            stats = dict(self.stats)
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['db_hits']) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,211 @@
+from array import array
+import math
+import mmap
+import os
+import struct
+import threading
+
+
+# Cache file layout: header, then 3 * count float64 coordinates, (count + 1) uint32 label offsets and the labels
+CACHE_MAGIC = b'KDG1'
+CACHE_HEADER = struct.Struct('<4sqqIQ')  # magic, source size, source mtime (ns), count, labels length
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_unit_vector(lat, lon):
+    """Convert latitude/longitude in degrees to a point on the unit sphere"""
+    lat, lon = math.radians(lat), math.radians(lon)
+    cos_lat = math.cos(lat)
+    return cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat)
+
+
+def chord_to_km(chord_squared):
+    """Convert a squared chord length between unit vectors to a great-circle distance in km"""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(chord_squared) / 2))
+
+
+def load_country_names(path):
+    """Load {country code: name} from a GeoNames countryInfo.txt file"""
+    names = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) > 4:
+                names[fields[0]] = fields[4]
+    return names
+
+
+def load_cities(path, country_names=None):
+    """Load (lat, lon, city, country) tuples from a GeoNames cities file (e.g. cities1000.txt)"""
+    country_names = country_names or {}
+    cities = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) < 9:
+                continue
+            try:
+                lat, lon = float(fields[4]), float(fields[5])
+            except ValueError:
+                continue
+            country_code = fields[8]
+            cities.append((lat, lon, fields[1], country_names.get(country_code, country_code)))
+    return cities
+
+
+def build_tree(points):
+    """Order points as an implicit k-d tree: each range's median is its node and splits it on axis depth % 3"""
+    stack = [(0, len(points), 0)]
+    while stack:
+        lo, hi, depth = stack.pop()
+        if hi - lo <= 1:
+            continue
+        axis = depth % 3
+        points[lo:hi] = sorted(points[lo:hi], key=lambda point: point[0][axis])
+        mid = (lo + hi) // 2
+        stack.append((lo, mid, depth + 1))
+        stack.append((mid + 1, hi, depth + 1))
+    return points
+
+
+def write_cache(cache_path, source_stat, points):
+    """Write an ordered tree to a cache file that can be memory-mapped on the next start"""
+    labels = bytearray()
+    offsets = [0]
+    coordinates = []
+    for vector, label in points:
+        coordinates.extend(vector)
+        labels += label.encode('utf-8')
+        offsets.append(len(labels))
+
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(CACHE_HEADER.pack(CACHE_MAGIC, source_stat.st_size, source_stat.st_mtime_ns, len(points), len(labels)))
+        # Native byte order, matching memoryview.cast() when the cache is read back
+        f.write(array('d', coordinates).tobytes())
+        f.write(array('I', offsets).tobytes())
+        f.write(labels)
+    os.replace(tmp_path, cache_path)
+
+
+class ReverseGeocoder:
+    """Offline nearest-city lookup over a GeoNames dataset.
+
+    Cities are stored as unit vectors in an implicit k-d tree, so nearest-neighbour search is a
+    plain Euclidean search with no special cases at the poles or the date line. The tree is built
+    once per dataset and saved next to it as a binary cache that later starts memory-map instead
+    of re-parsing the text file.
+    """
+
+    def __init__(self, dataset_path, country_info_path=None, cache_path=None):
+        self.dataset_path = dataset_path
+        self.cache_path = cache_path or f"{dataset_path}.kdtree"
+        source_stat = os.stat(dataset_path)
+
+        if not self._open_cache(source_stat):
+            country_names = load_country_names(country_info_path) if country_info_path and os.path.exists(country_info_path) else {}
+            points = build_tree([
+                (to_unit_vector(lat, lon), f"{city}\t{country}")
+                for lat, lon, city, country in load_cities(dataset_path, country_names)
+            ])
+            write_cache(self.cache_path, source_stat, points)
+            if not self._open_cache(source_stat):
+                raise RuntimeError(f"Could not read geocoder cache {self.cache_path}")
+
+    def _open_cache(self, source_stat):
+        """Memory-map the cache if it exists and was built from the current dataset"""
+        if not os.path.exists(self.cache_path):
+            return False
+
+        with open(self.cache_path, 'rb') as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file
+                return False
+
+        if len(data) < CACHE_HEADER.size:
+            data.close()
+            return False
+        magic, size, mtime_ns, count, labels_length = CACHE_HEADER.unpack_from(data)
+        if magic != CACHE_MAGIC or size != source_stat.st_size or mtime_ns != source_stat.st_mtime_ns:
+            data.close()
+            return False
+
+        view = memoryview(data)
+        coordinates_start = CACHE_HEADER.size
+        offsets_start = coordinates_start + 3 * count * 8
+        labels_start = offsets_start + (count + 1) * 4
+        self._mmap = data
+        self.count = count
+        self.coordinates = view[coordinates_start:offsets_start].cast('d')
+        self.offsets = view[offsets_start:labels_start].cast('I')
+        self.labels = view[labels_start:labels_start + labels_length]
+        return True
+
+    def _label(self, index):
+        city, country = bytes(self.labels[self.offsets[index]:self.offsets[index + 1]]).decode('utf-8').split('\t')
+        return city, country
+
+    def nearest(self, lat, lon):
+        """Get (city, country, distance in km) of the closest city, or None if the dataset is empty"""
+        if not self.count:
+            return None
+
+        query = to_unit_vector(lat, lon)
+        coordinates = self.coordinates
+        best = [float('inf'), -1]
+
+        def search(lo, hi, depth):
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            base = 3 * mid
+            dx = query[0] - coordinates[base]
+            dy = query[1] - coordinates[base + 1]
+            dz = query[2] - coordinates[base + 2]
+            distance = dx * dx + dy * dy + dz * dz
+            if distance < best[0]:
+                best[0], best[1] = distance, mid
+
+            axis = depth % 3
+            diff = query[axis] - coordinates[base + axis]
+            if diff < 0:
+                search(lo, mid, depth + 1)
+                if diff * diff < best[0]:
+                    search(mid + 1, hi, depth + 1)
+            else:
+                search(mid + 1, hi, depth + 1)
+                if diff * diff < best[0]:
+                    search(lo, mid, depth + 1)
+
+        search(0, self.count, 0)
+        city, country = self._label(best[1])
+        return city, country, chord_to_km(best[0])
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+_geocoder_loaded = False
+
+
+def get_geocoder():
+    """Get the shared offline geocoder for GEOCODER_DATASET, or None if no dataset is configured or it fails to load"""
+    global _geocoder, _geocoder_loaded
+    if _geocoder_loaded:
+        return _geocoder
+
+    with _geocoder_lock:
+        if not _geocoder_loaded:
+            dataset_path = os.getenv('GEOCODER_DATASET', os.path.join('data', 'cities1000.txt'))
+            if os.path.exists(dataset_path):
+                country_info_path = os.getenv('GEOCODER_COUNTRY_INFO', os.path.join(os.path.dirname(dataset_path), 'countryInfo.txt'))
+                try:
+                    _geocoder = ReverseGeocoder(dataset_path, country_info_path)
+                    print(f"Loaded offline geocoder with {_geocoder.count} cities from {dataset_path}")
+                except Exception as e:
+                    print(f"Error loading offline geocoder from {dataset_path}: {e}")
+            _geocoder_loaded = True
+    return _geocoder
@@ -0,0 +1,86 @@
+import threading
+
+from utils.lazy_import import lazy_import
+
+httpx = lazy_import('httpx')
+
+
+# Per-service settings. Each service gets its own connection pool, so one slow API can't use up
+# another's connections. Services not listed here use 'default'.
+SERVICES = {
+    'default': {'timeout': 10.0, 'connect_timeout': 5.0, 'max_connections': 10},
+    'songlink': {'timeout': 10.0, 'connect_timeout': 5.0, 'max_connections': 5},
+    # /ask answers are streamed, so the timeout is the longest wait between chunks
+    'deepseek': {'timeout': 60.0, 'connect_timeout': 5.0, 'max_connections': 10},
+    # Nominatim requires an identifying User-Agent. One connection is enough, since resolve_location already
+    # spaces requests at least a second apart, as its usage policy requires; the pool itself doesn't throttle
+    'nominatim': {'timeout': 10.0, 'connect_timeout': 5.0, 'max_connections': 1,
+                  'headers': {'User-Agent': 'not-object-bot'}},
+}
+
+# How long idle connections are kept open for reuse
+KEEPALIVE_SECONDS = 30.0
+
+
+def http2_available():
+    """Check whether httpx can use HTTP/2 (it needs the optional h2 package)"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HTTPClients:
+    """Shared, pooled HTTP clients for outbound calls, one per service.
+
+    Created in the bot's setup_hook and closed when the bot shuts down, so connections (and their
+    TCP/TLS handshakes) are reused across calls. Async code uses get(); code running in worker
+    threads, like photo ingest, uses get_sync().
+    """
+
+    def __init__(self, services=None):
+        self.services = services or SERVICES
+        self.http2 = http2_available()
+        self._async_clients = {}
+        self._sync_clients = {}
+        self._lock = threading.Lock()
+
+    def _client_options(self, name):
+        settings = self.services.get(name, self.services['default'])
+        return {
+            'timeout': httpx.Timeout(settings['timeout'], connect=settings['connect_timeout']),
+            'limits': httpx.Limits(
+                max_connections=settings['max_connections'],
+                max_keepalive_connections=settings['max_connections'],
+                keepalive_expiry=KEEPALIVE_SECONDS
+            ),
+            'headers': settings.get('headers'),
+            'follow_redirects': True
+        }
+
+    def get(self, name):
+        """Get the async client for a service"""
+        client = self._async_clients.get(name)
+        if client is None:
+            client = self._async_clients[name] = httpx.AsyncClient(http2=self.http2, **self._client_options(name))
+        return client
+
+    def get_sync(self, name):
+        """Get the blocking client for a service, for use from worker threads"""
+        with self._lock:
+            client = self._sync_clients.get(name)
+            if client is None:
+                # HTTP/2 is only worth it for the async clients, which multiplex concurrent requests
+                client = self._sync_clients[name] = httpx.Client(**self._client_options(name))
+            return client
+
+    async def close(self):
+        """Close every client and its pooled connections"""
+        for client in self._async_clients.values():
+            await client.aclose()
+        self._async_clients.clear()
+        with self._lock:
+            for client in self._sync_clients.values():
+                client.close()
+            self._sync_clients.clear()
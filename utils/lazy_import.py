@@ -0,0 +1,38 @@
+import importlib
+import sys
+
+
+class LazyModule:
+    """Module stand-in that only performs the real import on first attribute access"""
+
+    def __init__(self, name):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_module', None)
+
+    def _load(self):
+        module = object.__getattribute__(self, '_module')
+        if module is None:
+            module = importlib.import_module(object.__getattribute__(self, '_name'))
+            object.__setattr__(self, '_module', module)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        name = object.__getattribute__(self, '_name')
+        state = 'loaded' if object.__getattribute__(self, '_module') is not None else 'not loaded'
+        return f"<lazy module '{name}' ({state})>"
+
+
+def lazy_import(name):
+    """Return the module if it is already imported, otherwise a proxy that imports it on first use"""
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
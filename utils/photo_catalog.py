@@ -0,0 +1,52 @@
+import os
+import threading
+
+from utils.photo_metadata import is_image_file
+
+
+class PhotoCatalog:
+    """In-memory set of unrevealed and revealed photo file names.
+
+    It's filled by reconcile(), which scans both directories, and kept up to date as photos are
+    revealed, so the next reconcile can tell whether anything changed on disk. Safe to use from
+    worker threads.
+    """
+
+    def __init__(self, photos_dir, revealed_dir):
+        self.photos_dir = photos_dir
+        self.revealed_dir = revealed_dir
+        self.unrevealed = set()
+        self.revealed = set()
+        self.lock = threading.Lock()
+
+    def _scan(self, directory):
+        try:
+            with os.scandir(directory) as entries:
+                return {entry.name for entry in entries if entry.is_file() and is_image_file(entry.name)}
+        except FileNotFoundError:
+            return set()
+
+    def reconcile(self):
+        """Rescan both directories. Returns {filename: revealed} for everything on disk and whether anything changed"""
+        unrevealed = self._scan(self.photos_dir)
+        revealed = self._scan(self.revealed_dir) - unrevealed
+
+        with self.lock:
+            changed = unrevealed != self.unrevealed or revealed != self.revealed
+            self.unrevealed, self.revealed = unrevealed, revealed
+
+        on_disk = {filename: True for filename in revealed}
+        on_disk.update((filename, False) for filename in unrevealed)
+        return on_disk, changed
+
+    def mark_revealed(self, filename):
+        """Record that a photo was moved to the revealed directory"""
+        with self.lock:
+            self.unrevealed.discard(filename)
+            self.revealed.add(filename)
+
+    def remove(self, filename):
+        """Forget a photo that no longer exists"""
+        with self.lock:
+            self.unrevealed.discard(filename)
+            self.revealed.discard(filename)
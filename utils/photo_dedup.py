@@ -0,0 +1,84 @@
+from utils.lazy_import import lazy_import
+
+Image = lazy_import('PIL.Image')
+ImageOps = lazy_import('PIL.ImageOps')
+
+
+HASH_SIZE = 8  # 8x8 gradient bits = 64-bit hash
+
+
+def compute_dhash(path):
+    """Compute a 64-bit difference hash of an image, or None if it can't be read.
+
+    Runs in worker processes, so it has to stay a module-level function.
+    """
+    try:
+        with Image.open(path) as image:
+            # Let JPEGs decode at a fraction of their size; the hash only needs 9x8 pixels
+            image.draft('L', (HASH_SIZE * 8, HASH_SIZE * 8))
+            image = ImageOps.exif_transpose(image).convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+            pixels = list(image.getdata())
+    except Exception as e:
+        print(f"Error hashing photo {path}: {e}")
+        return None
+
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            right = pixels[row * (HASH_SIZE + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def to_signed(value):
+    """Convert an unsigned 64-bit hash to the signed range SQLite integers can hold"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def to_unsigned(value):
+    """Convert a hash read back from SQLite to an unsigned 64-bit value"""
+    return value + (1 << 64) if value < 0 else value
+
+
+def hamming_distance(a, b):
+    """Count differing bits between two hashes"""
+    return bin(a ^ b).count('1')
+
+
+class HammingIndex:
+    """Index of 64-bit hashes for finding the closest one within a fixed Hamming distance.
+
+    Uses the pigeonhole principle: hashes are split into max_distance + 1 bit chunks, and two hashes
+    within max_distance of each other must have at least one chunk in common. Each chunk has its own
+    hash table, so a lookup only compares against hashes sharing a chunk instead of all of them.
+    (A BK-tree barely prunes at 64 bits, since most pairs of hashes are about 32 bits apart.)
+    """
+
+    def __init__(self, max_distance, bits=64):
+        self.max_distance = max_distance
+        chunk_count = min(max_distance + 1, bits)
+        self.chunks = []  # (shift, mask)
+        start = 0
+        for i in range(chunk_count):
+            size = bits // chunk_count + (1 if i < bits % chunk_count else 0)
+            self.chunks.append((start, (1 << size) - 1))
+            start += size
+        self.tables = [{} for _ in self.chunks]
+        self.size = 0
+
+    def add(self, value, item):
+        """Add a hash with an item (e.g. a photo ID) attached"""
+        self.size += 1
+        for table, (shift, mask) in zip(self.tables, self.chunks):
+            table.setdefault((value >> shift) & mask, []).append((value, item))
+
+    def find(self, value):
+        """Get the (distance, item) of the closest hash within max_distance, or None"""
+        best = None
+        for table, (shift, mask) in zip(self.tables, self.chunks):
+            for other, item in table.get((value >> shift) & mask, ()):
+                distance = hamming_distance(value, other)
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, item)
+        return best
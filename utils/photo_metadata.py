@@ -0,0 +1,183 @@
+import datetime
+import os
+import threading
+import time
+
+from utils.geocoder import get_geocoder
+from utils.lazy_import import lazy_import
+
+Image = lazy_import('PIL.Image')
+ImageOps = lazy_import('PIL.ImageOps')
+ExifTags = lazy_import('PIL.ExifTags')
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+
+def is_image_file(filename):
+    """Check whether a file name has one of the supported image extensions"""
+    return filename.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def get_exif_data(image):
+    """Extract EXIF data from an open image as a dict keyed by tag name"""
+    try:
+        exif_data = image._getexif() if hasattr(image, '_getexif') else None
+        if exif_data is not None:
+            return {ExifTags.TAGS.get(tag_id, tag_id): value for tag_id, value in exif_data.items()}
+    except Exception as e:
+        print(f"Error reading EXIF data: {e}")
+    return {}
+
+
+def get_gps_data(exif_data):
+    """Extract GPS data from EXIF"""
+    if 'GPSInfo' not in exif_data:
+        return None
+
+    return {ExifTags.GPSTAGS.get(key, key): value for key, value in exif_data['GPSInfo'].items()}
+
+
+def convert_to_degrees(value):
+    """Convert GPS coordinates to degrees"""
+    d, m, s = value
+    return float(d) + (float(m) / 60.0) + (float(s) / 3600.0)
+
+
+def get_coordinates(gps_data):
+    """Get signed (latitude, longitude) from GPS data, or (None, None) if they're missing"""
+    if not gps_data:
+        return None, None
+
+    try:
+        lat = convert_to_degrees(gps_data['GPSLatitude'])
+        lon = convert_to_degrees(gps_data['GPSLongitude'])
+        if gps_data.get('GPSLatitudeRef') == 'S':
+            lat = -lat
+        if gps_data.get('GPSLongitudeRef') == 'W':
+            lon = -lon
+        return lat, lon
+    except Exception as e:
+        print(f"Error processing GPS data: {e}")
+        return None, None
+
+
+def get_taken_at(exif_data):
+    """Get when the photo was taken as an ISO timestamp, or None"""
+    value = exif_data.get('DateTimeOriginal') or exif_data.get('DateTime')
+    if not value:
+        return None
+    try:
+        return datetime.datetime.strptime(str(value).strip('\x00 '), '%Y:%m:%d %H:%M:%S').isoformat()
+    except ValueError:
+        return None
+
+
+def extract_metadata(path):
+    """Read a photo's dimensions, capture time and GPS coordinates"""
+    with Image.open(path) as image:
+        width, height = image.size
+        exif_data = get_exif_data(image)
+
+    lat, lon = get_coordinates(get_gps_data(exif_data))
+    return {
+        'width': width,
+        'height': height,
+        'taken_at': get_taken_at(exif_data),
+        'latitude': lat,
+        'longitude': lon
+    }
+
+
+def derivative_name(filename):
+    """Get the file name of a photo's Discord-sized copy"""
+    return f"{filename}.jpg"
+
+
+def make_derivative(source_path, derivative_path, max_dimension=2048, quality=85):
+    """Write a resized JPEG copy of a photo without its EXIF data (which includes GPS). Returns its size in bytes.
+    
+    Runs in worker processes, so it has to stay a module-level function.
+    """
+    with Image.open(source_path) as image:
+        # Bake in the EXIF rotation, since the EXIF is dropped
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        tmp_path = f"{derivative_path}.tmp"
+        image.save(tmp_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+    os.replace(tmp_path, derivative_path)
+    return os.path.getsize(derivative_path)
+
+
+def format_coordinates(lat, lon):
+    """Format coordinates as a (latitude, longitude) pair of display strings"""
+    return (f"{lat:.4f}°N" if lat >= 0 else f"{abs(lat):.4f}°S",
+            f"{lon:.4f}°E" if lon >= 0 else f"{abs(lon):.4f}°W")
+
+
+NOMINATIM_REVERSE_URL = "https://nominatim.openstreetmap.org/reverse"
+
+# Nominatim's usage policy allows at most one request per second
+NOMINATIM_MIN_INTERVAL_SECONDS = 1.0
+_nominatim_lock = threading.Lock()
+_nominatim_last_request = 0.0
+
+
+def _wait_for_nominatim():
+    """Block until the next Nominatim request is allowed. Call with _nominatim_lock held"""
+    global _nominatim_last_request
+    wait = _nominatim_last_request + NOMINATIM_MIN_INTERVAL_SECONDS - time.monotonic()
+    if wait > 0:
+        time.sleep(wait)
+    _nominatim_last_request = time.monotonic()
+
+
+def resolve_location(lat, lon, client=None):
+    """Get city and country for coordinates using reverse geocoding. Returns (None, None) if the lookup fails.
+    
+    Uses the offline geocoder if a dataset is configured, otherwise Nominatim through client (a pooled httpx.Client).
+    """
+    geocoder = get_geocoder()
+    if geocoder:
+        nearest = geocoder.nearest(lat, lon)
+        max_distance = float(os.getenv('GEOCODER_MAX_DISTANCE_KM', '50'))
+        if nearest and nearest[2] <= max_distance:
+            return nearest[0], nearest[1]
+        # Nowhere near a known city (e.g. at sea)
+        return format_coordinates(lat, lon)
+
+    # No offline dataset, ask Nominatim
+    if client is None:
+        print("Error reverse geocoding: no offline dataset and no HTTP client for Nominatim")
+        return None, None
+    try:
+        # Held for the whole request, so requests are spaced out from when each one is sent
+        with _nominatim_lock:
+            _wait_for_nominatim()
+            response = client.get(NOMINATIM_REVERSE_URL, params={'lat': lat, 'lon': lon, 'format': 'json', 'addressdetails': 1})
+        response.raise_for_status()
+        location = response.json()
+    except Exception as e:
+        print(f"Error reverse geocoding {lat:.4f}, {lon:.4f}: {e}")
+        return None, None
+
+    # Nominatim answers {"error": ...} when there's nothing at the coordinates
+    if location and 'error' not in location:
+        address = location.get('address', {})
+        city = address.get('city') or address.get('town') or address.get('village') or address.get('hamlet')
+        country = address.get('country')
+
+        if city and country:
+            return city, country
+        elif country:
+            return format_coordinates(lat, lon)[0], country
+    # Fall back to coordinates if geocoding found nothing
+    return format_coordinates(lat, lon)
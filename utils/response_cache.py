@@ -0,0 +1,78 @@
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+from utils.database import get_cached_llm_response, save_cached_llm_response
+
+
+def normalize_question(question):
+    """Normalize a question so trivial differences (case, spacing, quotes, trailing punctuation) share a cache entry"""
+    text = unicodedata.normalize('NFKC', question).casefold()
+    text = text.replace('’', "'").replace('‘', "'").replace('“', '"').replace('”', '"')
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text.rstrip('?!.。？！ ')
+
+
+def make_cache_key(question, *context):
+    """Hash a normalized question together with everything else that shapes the answer (system prompt, model, ...)"""
+    digest = hashlib.sha256()
+    for part in (*context, normalize_question(question)):
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """LRU cache of LLM responses with a TTL, backed by the llm_response_cache table so it survives restarts"""
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # cache key -> (response, created_at)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key):
+        """Get a cached response, or None"""
+        if not self.enabled:
+            return None
+
+        min_created_at = int(time.time() - self.ttl_seconds)
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] < min_created_at:
+            del self.entries[key]
+            entry = None
+
+        if entry is None:
+            # Loading from the table marks the row as used, so its LRU order follows what's actually asked
+            entry = get_cached_llm_response(key, min_created_at)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._remember(key, entry)
+        else:
+            self.entries.move_to_end(key)
+
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, response):
+        """Cache a response"""
+        if not self.enabled:
+            return
+
+        created_at = int(time.time())
+        self._remember(key, (response, created_at))
+        save_cached_llm_response(key, response, created_at, self.max_entries, int(created_at - self.ttl_seconds))
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
@@ -0,0 +1,52 @@
+import time
+
+
+class StartupTimer:
+    """Collect how long each startup phase takes and print a report once the bot is ready"""
+
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        self.phases = []  # List of (phase name, seconds)
+        self.reported = False
+
+    def record(self, phase, seconds):
+        """Record the duration of a phase"""
+        self.phases.append((phase, seconds))
+
+    def phase(self, name):
+        """Context manager that times the wrapped block as a phase"""
+        return _Phase(self, name)
+
+    def elapsed(self):
+        """Seconds since the timer was started"""
+        return time.perf_counter() - self.start
+
+    def report(self):
+        """Print the startup report (only the first time it is called)"""
+        if self.reported:
+            return
+        self.reported = True
+
+        print("Startup timing report:")
+        for name, seconds in self.phases:
+            print(f"  {name:<28} {seconds * 1000:8.1f} ms")
+        print(f"  {'total (to first READY)':<28} {self.elapsed() * 1000:8.1f} ms")
+
+
+class _Phase:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+        self.started = None
+        self.index = None
+
+    def __enter__(self):
+        # Reserve the slot now so nested phases are reported after their parent
+        self.index = len(self.timer.phases)
+        self.timer.phases.append((self.name, 0.0))
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer.phases[self.index] = (self.name, time.perf_counter() - self.started)
+        return False